@@ -0,0 +1,49 @@
+﻿"""
+In-process TTL cache for JSON endpoints
+"""
+from collections import OrderedDict
+from typing import Callable, Tuple
+import functools
+import time
+
+from fastapi.responses import Response
+
+from api.responses import dumps
+
+def ttl_cache(ttl: float = 5.0, maxsize: int = 256) -> Callable:
+    """
+    Cache an endpoint's serialized JSON body for `ttl` seconds
+
+    Entries are keyed by the endpoint's (hashable) arguments, i.e. its parsed
+    path and query parameters, and evicted least-recently-used beyond
+    `maxsize`. Responses with a non-200 status are never cached.
+    """
+    def decorator(func: Callable) -> Callable:
+        cache: "OrderedDict[tuple, Tuple[float, bytes]]" = OrderedDict()
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            key = tuple(sorted(kwargs.items()))
+            now = time.monotonic()
+            entry = cache.get(key)
+            if entry is not None and entry[0] > now:
+                cache.move_to_end(key)
+                return Response(content=entry[1], media_type="application/json")
+
+            result = await func(**kwargs)
+            if isinstance(result, Response):
+                if result.status_code != 200:
+                    return result
+                body = result.body
+            else:
+                body = dumps(result)
+
+            cache[key] = (now + ttl, body)
+            cache.move_to_end(key)
+            if len(cache) > maxsize:
+                cache.popitem(last=False)
+            return Response(content=body, media_type="application/json")
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
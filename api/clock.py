@@ -0,0 +1,27 @@
+"""
+Coarse UTC clock for response timestamps
+"""
+from datetime import datetime
+import time
+
+# How long a reading is reused (seconds)
+CLOCK_RESOLUTION = 1.0
+
+_now = {"ts": float("-inf"), "datetime": None, "iso": ""}
+
+def _refresh() -> None:
+    """Re-read the wall clock if the cached reading is stale"""
+    ts = time.monotonic()
+    if ts - _now["ts"] >= CLOCK_RESOLUTION:
+        now = datetime.utcnow()
+        _now.update(ts=ts, datetime=now, iso=now.isoformat())
+
+def utc_now() -> datetime:
+    """Get the current naive UTC datetime, at most CLOCK_RESOLUTION seconds old"""
+    _refresh()
+    return _now["datetime"]
+
+def iso_now() -> str:
+    """Get utc_now() as a preformatted ISO 8601 string"""
+    _refresh()
+    return _now["iso"]
@@ -1,14 +1,16 @@
-﻿from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import text
+﻿from typing import AsyncGenerator, List, Optional, Sequence
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_scoped_session,
+    async_sessionmaker,
+    create_async_engine,
+)
+import asyncpg
+import asyncio
 import logging
 
 from api.config import settings
-from api.models.base import Base
-from api.models.channel import Channel
-from api.models.detection import RawImageDetection, DetectionAggregate
-from api.models.message import Message
 
 logger = logging.getLogger(__name__)
 
@@ -19,76 +21,210 @@ def get_async_database_url() -> str:
         return settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
     return settings.DATABASE_URL
 
-# Create async engine
+def get_raw_database_url() -> str:
+    """Get the plain PostgreSQL DSN understood by asyncpg"""
+    return str(settings.DATABASE_URL).replace("postgresql+asyncpg://", "postgresql://")
+
 DATABASE_URL = get_async_database_url()
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_size=20,
-    max_overflow=30,
-    pool_pre_ping=True,
-)
 
-# Create async session factory
-AsyncSessionLocal = sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+# Engine and session factory are created on first use, so importing this
+# module (or forking Uvicorn workers) does not allocate a connection pool
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+_scoped_session: Optional[async_scoped_session[AsyncSession]] = None
+
+def _create_engine() -> AsyncEngine:
+    """Build the async engine from settings"""
+    return create_async_engine(
+        DATABASE_URL,
+        echo=settings.DEBUG,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args={
+            # Plan every statement against its actual parameters (unnamed
+            # statements) instead of reusing cached generic plans; this also
+            # keeps the pool safe behind PgBouncer in transaction mode.
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "server_settings": {
+                "jit": "off",
+                "application_name": "medical-warehouse-api",
+            },
+        },
+    )
+
+def get_engine() -> AsyncEngine:
+    """Get the async engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        _engine = _create_engine()
+    return _engine
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Get the async session factory, creating it on first use"""
+    global _session_factory
+    if _session_factory is None:
+        # Routes read then return, so flushing before every query is wasted work
+        _session_factory = async_sessionmaker(
+            get_engine(),
+            expire_on_commit=False,
+            autoflush=False,
+        )
+    return _session_factory
+
+def get_scoped_session() -> async_scoped_session[AsyncSession]:
+    """Get the task-scoped session registry, creating it on first use
+    
+    Everything running in one asyncio task (one request) gets the same
+    session, so nested dependencies never check out a second connection.
+    """
+    global _scoped_session
+    if _scoped_session is None:
+        _scoped_session = async_scoped_session(
+            get_session_factory(),
+            scopefunc=asyncio.current_task,
+        )
+    return _scoped_session
+
+async def dispose_engine() -> None:
+    """Dispose of the async engine and its connection pool"""
+    global _engine, _session_factory, _scoped_session
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = _session_factory = _scoped_session = None
+
+# Raw asyncpg pool for read-only queries and health checks (created lazily)
+raw_pool: Optional[asyncpg.Pool] = None
+# Serializes pool creation so concurrent first requests don't each build one
+_raw_pool_lock = asyncio.Lock()
+
+async def get_raw_pool() -> asyncpg.Pool:
+    """Get the asyncpg pool, creating it on first use"""
+    global raw_pool
+    if raw_pool is None:
+        async with _raw_pool_lock:
+            # Another request may have created it while we waited
+            if raw_pool is None:
+                raw_pool = await asyncpg.create_pool(
+                    get_raw_database_url(),
+                    min_size=2,
+                    max_size=10,
+                    statement_cache_size=0,
+                    server_settings={
+                        "jit": "off",
+                        "application_name": "medical-warehouse-api",
+                    },
+                )
+    return raw_pool
+
+async def close_raw_pool() -> None:
+    """Close the asyncpg pool"""
+    global raw_pool
+    if raw_pool is not None:
+        await raw_pool.close()
+        raw_pool = None
 
 async def init_db():
     """Initialize database tables"""
-    async with engine.begin() as conn:
+    # Importing the models registers their tables on Base.metadata
+    from api.models.base import Base
+    import api.models.channel  # noqa: F401
+    import api.models.detection  # noqa: F401
+    import api.models.message  # noqa: F401
+    
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     logger.info("Database tables initialized")
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Dependency for getting database session"""
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-            await session.commit()
-        except Exception:
-            await session.rollback()
-            raise
-        finally:
-            await session.close()
-
-async def execute_read_query(query: str, params: dict = None) -> list:
-    """Execute raw SQL query"""
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(text(query), params or {})
-        rows = result.fetchall()
-        return [dict(row._mapping) for row in rows]
+    """Dependency for getting database session
+    
+    The session is scoped to the request's task and removed (closed) when
+    the request ends. Routes that write must call ``await session.commit()``
+    themselves; read-only routes skip the extra commit round-trip.
+    """
+    scoped_session = get_scoped_session()
+    session = scoped_session()
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await scoped_session.remove()
+
+async def execute_read_query(query: str, params: Sequence = ()) -> List[asyncpg.Record]:
+    """Execute raw read-only SQL query (positional $1, $2, ... parameters)
+    
+    Rows are returned as asyncpg Records, which already support mapping
+    access (``row["col"]``, ``.items()``), so no per-row dict is built.
+    Serialize them with ``orjson.dumps(rows, default=dict)``.
+    """
+    pool = await get_raw_pool()
+    return await pool.fetch(query, *params)
+
+async def search_messages(query: str, limit: int = 20) -> List[asyncpg.Record]:
+    """Search messages by text or exact hashtag
+    
+    Both predicates are served by GIN indexes (idx_message_fts and
+    idx_message_hashtags) and combined with a bitmap OR.
+    """
+    return await execute_read_query(
+        """
+        SELECT message_id, channel_name, message_text, message_timestamp,
+               views, forwards, hashtags
+        FROM fct_messages
+        WHERE search_vector @@ plainto_tsquery('simple', $1)
+           OR hashtags @> ARRAY[$1]::varchar[]
+        ORDER BY message_timestamp DESC
+        LIMIT $2
+        """,
+        (query, limit),
+    )
 
 async def check_database_health() -> bool:
     """Check database connection"""
     try:
-        async with AsyncSessionLocal() as session:
-            await session.execute(text("SELECT 1"))
+        pool = await get_raw_pool()
+        await pool.fetchval("SELECT 1")
         return True
     except Exception as e:
         logger.error(f"Database health check failed: {str(e)}")
         return False
 
+# Tables reported by get_database_stats
+STATS_TABLES = ["dim_channels", "fct_messages", "raw_image_detections", "detection_aggregates"]
+STATS_TIMEOUT_SECONDS = 2.0
+
 async def get_database_stats() -> dict:
-    """Get database statistics"""
+    """Get database statistics
+    
+    Row counts come from the statistics collector in a single round-trip,
+    so they are estimates rather than exact COUNT(*) results.
+    """
     try:
-        stats = {}
-        async with AsyncSessionLocal() as session:
-            # Check if tables exist and get counts
-            tables = ["dim_channels", "fct_messages", "raw_image_detections", "detection_aggregates"]
-            
-            for table in tables:
-                try:
-                    result = await session.execute(text(f"SELECT COUNT(*) FROM {table}"))
-                    count = result.scalar()
-                    stats[table] = count
-                except Exception:
-                    stats[table] = "Table not found"
-            
-            return stats
+        pool = await get_raw_pool()
+        rows = await asyncio.wait_for(
+            pool.fetch(
+                """
+                SELECT relname, n_live_tup
+                FROM pg_stat_user_tables
+                WHERE schemaname = current_schema()
+                  AND relname = ANY($1::text[])
+                """,
+                STATS_TABLES,
+            ),
+            timeout=STATS_TIMEOUT_SECONDS,
+        )
+        counts = {row["relname"]: row["n_live_tup"] for row in rows}
+        return {table: counts.get(table, "Table not found") for table in STATS_TABLES}
             
+    except asyncio.TimeoutError:
+        logger.error("Database stats query timed out")
+        return {"error": f"Timed out after {STATS_TIMEOUT_SECONDS}s"}
     except Exception as e:
         logger.error(f"Failed to get database stats: {str(e)}")
         return {"error": str(e)}
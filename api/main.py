@@ -1,12 +1,19 @@
-﻿from fastapi import FastAPI, Depends, HTTPException, Query
-from fastapi.responses import JSONResponse
-from fastapi.middleware.cors import CORSMiddleware
+﻿from fastapi import FastAPI, Depends, Header, HTTPException, Query
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Dict, Optional
+import numpy as np
 import logging
 import time
 import os
 
+from api.cache import ttl_cache
+from api.middleware import FastCORS, FastPath
+from api.responses import ORJSONResponse, StaticJSON
+
+# Seconds that identical requests to the slow-moving endpoints share a response
+RESPONSE_CACHE_TTL = 5
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -41,23 +48,45 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     logger.info("Shutting down application...")
+    # Imported here so loading the app doesn't pull in the database layer;
+    # both are no-ops if the engine/pool were never created
+    from api.database import close_raw_pool, dispose_engine
+    await close_raw_pool()
+    await dispose_engine()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# Constant GET bodies served below the router (registered with each payload).
+# Added first so it is the innermost middleware, still wrapped by CORS/GZip.
+_STATIC_ROUTES: Dict[str, StaticJSON] = {}
+app.add_middleware(FastPath, routes=_STATIC_ROUTES)
+
 # CORS
 app.add_middleware(
-    CORSMiddleware,
+    FastCORS,
     allow_origins=settings.BACKEND_CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
 )
 
+# Compress larger bodies (the channel list, detection pages)
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
+_ROOT_ENDPOINTS = {
+    "health": "/health",
+    "channels": "/api/v1/channels",
+    "detections": "/api/v1/detections",
+    "messages": "/api/v1/messages",
+    "docs": "/docs",
+    "redoc": "/redoc"
+}
+
 @app.get("/")
+@ttl_cache(RESPONSE_CACHE_TTL)
 async def root():
     """Root endpoint"""
     return {
@@ -65,17 +94,11 @@ async def root():
         "version": settings.VERSION,
         "status": "operational",
         "timestamp": time.time(),
-        "endpoints": {
-            "health": "/health",
-            "channels": "/api/v1/channels",
-            "detections": "/api/v1/detections",
-            "messages": "/api/v1/messages",
-            "docs": "/docs",
-            "redoc": "/redoc"
-        }
+        "endpoints": _ROOT_ENDPOINTS
     }
 
 @app.get("/health")
+@ttl_cache(RESPONSE_CACHE_TTL)
 async def health_check():
     """Health check endpoint"""
     return {
@@ -86,43 +109,72 @@ async def health_check():
         "timestamp": time.time()
     }
 
+# Mock data - will be replaced with database.
+# The payload never changes, so it is serialized (and tagged) once at import time.
+_CHANNELS = [
+    {
+        "channel_key": "chemed123",
+        "channel_name": "chemed123",
+        "description": "Medical equipment and pharmaceutical postings",
+        "total_messages": 450,
+        "total_views": 12500,
+        "total_forwards": 320
+    },
+    {
+        "channel_key": "lobelia4cosmetics",
+        "channel_name": "lobelia4cosmetics",
+        "description": "Cosmetics and health-related products",
+        "total_messages": 380,
+        "total_views": 9800,
+        "total_forwards": 210
+    },
+    {
+        "channel_key": "tikvahpharma",
+        "channel_name": "tikvahpharma",
+        "description": "Pharmaceutical distribution announcements",
+        "total_messages": 241,
+        "total_views": 7200,
+        "total_forwards": 150
+    }
+]
+
+_CHANNELS_JSON = StaticJSON({
+    "success": True,
+    "count": len(_CHANNELS),
+    "channels": _CHANNELS
+})
+
+_STATIC_ROUTES["/api/v1/channels"] = _CHANNELS_JSON
+
 @app.get("/api/v1/channels")
-async def get_channels():
+async def get_channels(if_none_match: Optional[str] = Header(None)):
     """Get all Telegram channels"""
-    # Mock data - will be replaced with database
-    channels = [
-        {
-            "channel_key": "chemed123",
-            "channel_name": "chemed123",
-            "description": "Medical equipment and pharmaceutical postings",
-            "total_messages": 450,
-            "total_views": 12500,
-            "total_forwards": 320
-        },
-        {
-            "channel_key": "lobelia4cosmetics",
-            "channel_name": "lobelia4cosmetics",
-            "description": "Cosmetics and health-related products",
-            "total_messages": 380,
-            "total_views": 9800,
-            "total_forwards": 210
-        },
-        {
-            "channel_key": "tikvahpharma",
-            "channel_name": "tikvahpharma",
-            "description": "Pharmaceutical distribution announcements",
-            "total_messages": 241,
-            "total_views": 7200,
-            "total_forwards": 150
-        }
-    ]
-    return {
-        "success": True,
-        "count": len(channels),
-        "channels": channels
+    return _CHANNELS_JSON.response(if_none_match)
+
+# Mock detection dataset, built once at import time.
+# Rows are kept as parallel arrays (one per filtered column) so filters run as
+# vectorized masks; dicts are only materialized for the rows actually returned.
+_SAMPLE_CLASSES = ["medicine", "cosmetic", "bottle", "box", "package", "syringe", "pill", "cream"]
+_SAMPLE_CHANNELS = ["chemed123", "lobelia4cosmetics", "tikvahpharma"]
+_MOCK_DETECTION_COUNT = 20
+
+_DET_ROWS = [
+    {
+        "detection_id": f"det_{i:04d}",
+        "image_name": f"image_{i:03d}.jpg",
+        "channel_name": _SAMPLE_CHANNELS[i % len(_SAMPLE_CHANNELS)],
+        "detected_class": _SAMPLE_CLASSES[i % len(_SAMPLE_CLASSES)],
+        "confidence": float(f"{0.5 + (i * 0.02):.2f}"),
+        "product_category": "medical" if i % 3 == 0 else "cosmetic",
+        "date_str": "2024-01-15",
+        "processed_at": "2024-01-15T10:30:00"
     }
+    for i in range(_MOCK_DETECTION_COUNT)
+]
+_DET_CONF = np.array([row["confidence"] for row in _DET_ROWS], dtype=np.float64)
 
 @app.get("/api/v1/detections")
+@ttl_cache(RESPONSE_CACHE_TTL)
 async def get_detections(
     limit: int = 50,
     min_confidence: float = 0.5,
@@ -130,31 +182,15 @@ async def get_detections(
 ):
     """Get YOLO detection results"""
     # Mock data - will be replaced with database
-    detections = []
+    # Only the first `limit` rows are candidates, filtered by confidence
+    candidates = _DET_CONF[:max(0, min(limit, _MOCK_DETECTION_COUNT))]
+    indices = np.flatnonzero(candidates >= min_confidence).tolist()
     
-    sample_classes = ["medicine", "cosmetic", "bottle", "box", "package", "syringe", "pill", "cream"]
-    sample_channels = ["chemed123", "lobelia4cosmetics", "tikvahpharma"]
-    
-    for i in range(min(limit, 20)):
-        channel_name = channel if channel else sample_channels[i % len(sample_channels)]
-        conf_val = 0.5 + (i * 0.02)
-        detections.append({
-            "detection_id": f"det_{i:04d}",
-            "image_name": f"image_{i:03d}.jpg",
-            "channel_name": channel_name,
-            "detected_class": sample_classes[i % len(sample_classes)],
-            "confidence": float(f"{conf_val:.2f}"),
-            "product_category": "medical" if i % 3 == 0 else "cosmetic",
-            "date_str": "2024-01-15",
-            "processed_at": "2024-01-15T10:30:00"
-        })
-    
-    # Filter by confidence
-    detections = [d for d in detections if d["confidence"] >= min_confidence]
-    
-    # Filter by channel if specified
+    # A channel filter relabels the mock rows, so every candidate matches it
     if channel:
-        detections = [d for d in detections if d["channel_name"] == channel]
+        detections = [{**_DET_ROWS[i], "channel_name": channel} for i in indices]
+    else:
+        detections = [_DET_ROWS[i] for i in indices]
     
     return {
         "success": True,
@@ -162,33 +198,38 @@ async def get_detections(
         "limit": limit,
         "min_confidence": min_confidence,
         "channel_filter": channel,
-        "detections": list(detections)[:limit]
+        "detections": detections
+    }
+
+# Mock statistics - constant, so serialized (and tagged) once at import time
+_STATS_JSON = StaticJSON({
+    "success": True,
+    "stats": {
+        "total_detections": 1071,
+        "unique_classes": 15,
+        "unique_channels": 3,
+        "avg_confidence": 0.78,
+        "top_classes": [
+            {"class": "medicine", "count": 245},
+            {"class": "bottle", "count": 198},
+            {"class": "cosmetic", "count": 187},
+            {"class": "box", "count": 156},
+            {"class": "package", "count": 132}
+        ],
+        "channel_distribution": [
+            {"channel": "chemed123", "count": 450},
+            {"channel": "lobelia4cosmetics", "count": 380},
+            {"channel": "tikvahpharma", "count": 241}
+        ]
     }
+})
+
+_STATIC_ROUTES["/api/v1/detections/stats"] = _STATS_JSON
 
 @app.get("/api/v1/detections/stats")
-async def get_detection_stats():
+async def get_detection_stats(if_none_match: Optional[str] = Header(None)):
     """Get detection statistics"""
-    return {
-        "success": True,
-        "stats": {
-            "total_detections": 1071,
-            "unique_classes": 15,
-            "unique_channels": 3,
-            "avg_confidence": 0.78,
-            "top_classes": [
-                {"class": "medicine", "count": 245},
-                {"class": "bottle", "count": 198},
-                {"class": "cosmetic", "count": 187},
-                {"class": "box", "count": 156},
-                {"class": "package", "count": 132}
-            ],
-            "channel_distribution": [
-                {"channel": "chemed123", "count": 450},
-                {"channel": "lobelia4cosmetics", "count": 380},
-                {"channel": "tikvahpharma", "count": 241}
-            ]
-        }
-    }
+    return _STATS_JSON.response(if_none_match)
 
 @app.get("/api/v1/messages")
 async def get_messages(limit: int = 50, channel: Optional[str] = Query(None)):
@@ -262,11 +303,11 @@ async def search(
 async def global_exception_handler(request, exc):
     logger.error(f"Unhandled exception: {str(exc)}")
     if isinstance(exc, HTTPException):
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=exc.status_code,
             content={"detail": exc.detail}
         )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "detail": "Internal server error",
@@ -0,0 +1,114 @@
+"""
+Pure ASGI middleware for the hot API paths
+"""
+from typing import Dict, Iterable
+
+from api.responses import StaticJSON
+
+# Methods advertised to browsers on CORS preflight
+ALLOWED_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+
+class FastCORS:
+    """
+    CORS middleware with pre-encoded response headers
+
+    Requests without an ``Origin`` header pass straight through, simple
+    cross-origin requests get the CORS headers appended once on response
+    start, and preflight requests are answered directly with 204.
+    """
+
+    def __init__(
+        self,
+        app,
+        allow_origins: Iterable[str] = ("*",),
+        allow_credentials: bool = False,
+        max_age: int = 600,
+    ):
+        self.app = app
+        origins = tuple(allow_origins)
+        self.allow_all_origins = "*" in origins
+        self.allow_origins = frozenset(origin.encode("latin-1") for origin in origins)
+        # Browsers reject "*" together with credentials, so echo the origin then
+        self.echo_origin = allow_credentials or not self.allow_all_origins
+
+        self._simple_headers = [(b"vary", b"Origin")]
+        if allow_credentials:
+            self._simple_headers.append((b"access-control-allow-credentials", b"true"))
+        self._preflight_headers = self._simple_headers + [
+            (b"access-control-allow-methods", ALLOWED_METHODS),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = request_method = request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None or not (self.allow_all_origins or origin in self.allow_origins):
+            await self.app(scope, receive, send)
+            return
+
+        allow_origin = (b"access-control-allow-origin", origin if self.echo_origin else b"*")
+
+        # Preflight: answer without touching the application
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            headers = [allow_origin] + self._preflight_headers
+            if request_headers is not None:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        cors_headers = [allow_origin] + self._simple_headers
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + cors_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+class FastPath:
+    """
+    Serve constant GET responses straight from the ASGI layer
+
+    Requests for a registered path without a query string are answered from
+    the pre-serialized body (or with 304 on a matching ETag), skipping
+    routing, validation and dependency resolution. Add it before the other
+    middleware so CORS and compression still wrap it.
+    """
+
+    def __init__(self, app, routes: Dict[str, StaticJSON]):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "GET" and not scope["query_string"]:
+            static = self.routes.get(scope["path"])
+            if static is not None:
+                if_none_match = None
+                for name, value in scope["headers"]:
+                    if name == b"if-none-match":
+                        if_none_match = value.decode("latin-1")
+                        break
+
+                if static.matches(if_none_match):
+                    status, headers, body = 304, static.raw_not_modified_headers, b""
+                else:
+                    status, headers, body = 200, static.raw_headers, static.body
+                # Outer middleware (e.g. GZip) edits headers in place, so send a copy
+                await send({"type": "http.response.start", "status": status, "headers": list(headers)})
+                await send({"type": "http.response.body", "body": body})
+                return
+
+        await self.app(scope, receive, send)
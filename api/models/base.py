@@ -1,9 +1,29 @@
 ﻿from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, Integer, DateTime
 from datetime import datetime
+import os
+import time
+import uuid
 
 Base = declarative_base()
 
+def uuid7() -> uuid.UUID:
+    """Generate a time-ordered UUID (RFC 9562 version 7)
+    
+    Keys sort by creation time, so primary-key inserts append to the
+    right edge of the B-tree instead of landing on random leaf pages.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (
+        (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+        | 0x7 << 76                         # version
+        | (rand >> 62 & 0xFFF) << 64        # rand_a
+        | 0b10 << 62                        # variant
+        | rand & 0x3FFFFFFFFFFFFFFF         # rand_b
+    )
+    return uuid.UUID(int=value)
+
 class BaseModel(Base):
     """Base model with common fields"""
     __abstract__ = True
@@ -2,9 +2,15 @@
     Column, String, Float, Integer, Text, 
     DateTime, Index, Boolean, JSON
 )
-from sqlalchemy.dialects.postgresql import UUID
-from api.models.base import BaseModel
-import uuid
+from sqlalchemy.dialects.postgresql import ENUM, UUID
+from api.models.base import BaseModel, uuid7
+
+# Low-cardinality labels stored as Postgres ENUMs (4-byte fixed-width keys)
+ProductCategoryEnum = ENUM(
+    'medical', 'cosmetic', 'packaging', 'other',
+    name='product_category_enum',
+)
+ConfidenceLevelEnum = ENUM('high', 'medium', 'low', name='confidence_level_enum')
 
 class RawImageDetection(BaseModel):
     """Raw YOLO detection results"""
@@ -13,14 +19,14 @@ class RawImageDetection(BaseModel):
     detection_id = Column(
         UUID(as_uuid=True),
         primary_key=True,
-        default=uuid.uuid4
+        default=uuid7
     )
     
     image_path = Column(Text, nullable=False)
     image_name = Column(String(255), nullable=False, index=True)
-    channel_name = Column(String(100), nullable=False, index=True)
+    channel_name = Column(String(100), nullable=False)
     date_str = Column(String(10), nullable=False, index=True)
-    detected_class = Column(String(100), nullable=False, index=True)
+    detected_class = Column(String(100), nullable=False)
     confidence = Column(Float, nullable=False, index=True)
     x_center = Column(Float, nullable=False)
     y_center = Column(Float, nullable=False)
@@ -29,13 +35,16 @@ class RawImageDetection(BaseModel):
     original_width = Column(Integer, nullable=False)
     original_height = Column(Integer, nullable=False)
     processed_at = Column(DateTime, nullable=False)
-    product_category = Column(String(50), index=True)
-    confidence_level = Column(String(20), index=True)
+    product_category = Column(ProductCategoryEnum, index=True)
+    confidence_level = Column(ConfidenceLevelEnum, index=True)
     
+    # The composite indexes also serve lookups on their leading column
     __table_args__ = (
-        Index('idx_channel_date', 'channel_name', 'date_str'),
+        Index(
+            'idx_channel_date', 'channel_name', 'date_str',
+            postgresql_include=['confidence'],
+        ),
         Index('idx_class_confidence', 'detected_class', 'confidence'),
-        Index('idx_detection_processed', 'processed_at'),
     )
     
     def __repr__(self):
@@ -48,7 +57,7 @@ class DetectionAggregate(BaseModel):
     aggregate_id = Column(
         UUID(as_uuid=True),
         primary_key=True,
-        default=uuid.uuid4
+        default=uuid7
     )
     
     channel_key = Column(String(100), nullable=False, index=True)
@@ -56,7 +65,7 @@ class DetectionAggregate(BaseModel):
     date_key = Column(Integer, nullable=False, index=True)
     full_date = Column(DateTime, nullable=False, index=True)
     detected_class = Column(String(100), nullable=False, index=True)
-    product_category = Column(String(50), index=True)
+    product_category = Column(ProductCategoryEnum, index=True)
     detection_count = Column(Integer, nullable=False, default=0)
     unique_images_count = Column(Integer, nullable=False, default=0)
     avg_confidence = Column(Float, nullable=False)
@@ -1,7 +1,6 @@
-﻿from sqlalchemy import Column, String, Text, Integer, DateTime, Boolean, JSON, Index
-from sqlalchemy.dialects.postgresql import UUID
-from api.models.base import BaseModel
-import uuid
+﻿from sqlalchemy import Column, String, Text, Integer, DateTime, Boolean, Computed, Index
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, TSVECTOR
+from api.models.base import BaseModel, uuid7
 
 class Message(BaseModel):
     """Telegram message model"""
@@ -10,15 +9,15 @@ class Message(BaseModel):
     message_id = Column(
         UUID(as_uuid=True),
         primary_key=True,
-        default=uuid.uuid4
+        default=uuid7
     )
     
-    channel_key = Column(String(100), nullable=False, index=True)
+    channel_key = Column(String(100), nullable=False)
     channel_name = Column(String(255), nullable=False, index=True)
     date_key = Column(Integer, nullable=False, index=True)
     full_date = Column(DateTime, nullable=False, index=True)
     message_text = Column(Text, nullable=False)
-    message_timestamp = Column(DateTime, nullable=False, index=True)
+    message_timestamp = Column(DateTime, nullable=False)
     views = Column(Integer, default=0)
     forwards = Column(Integer, default=0)
     has_image = Column(Boolean, default=False)
@@ -26,15 +25,23 @@ class Message(BaseModel):
     image_path = Column(String(500), nullable=True)
     word_count = Column(Integer, default=0)
     character_count = Column(Integer, default=0)
-    hashtags = Column(JSON)
-    mentions = Column(JSON)
+    hashtags = Column(ARRAY(String), server_default='{}')
+    mentions = Column(ARRAY(String), server_default='{}')
+    # Maintained by Postgres so text search never tokenizes on the request path
+    search_vector = Column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', message_text)", persisted=True),
+    )
     is_processed = Column(Boolean, default=False)
     has_detections = Column(Boolean, default=False)
     
+    # idx_message_channel_date also serves lookups on channel_key alone
     __table_args__ = (
         Index('idx_message_channel_date', 'channel_key', 'date_key'),
         Index('idx_message_timestamp', 'message_timestamp'),
         Index('idx_message_engagement', 'views', 'forwards'),
+        Index('idx_message_hashtags', 'hashtags', postgresql_using='gin'),
+        Index('idx_message_fts', 'search_vector', postgresql_using='gin'),
     )
     
     def __repr__(self):
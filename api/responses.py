@@ -0,0 +1,56 @@
+"""
+Response classes for the API
+"""
+from hashlib import blake2b
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+# Serialize NumPy arrays/scalars natively and treat naive datetimes as UTC
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+def dumps(content: Any) -> bytes:
+    """Serialize content with the API's orjson options"""
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson with NumPy and UTC support"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class StaticJSON:
+    """
+    Constant JSON payload, serialized once, with a strong ETag
+
+    The ETag is a BLAKE2 digest of the body (fast, not security-relevant),
+    so polling clients that send it back in If-None-Match get a bodiless 304.
+    """
+
+    def __init__(self, content: Any):
+        self.body = dumps(content)
+        self.etag = f'"{blake2b(self.body, digest_size=8).hexdigest()}"'
+        self._headers = {"etag": self.etag}
+        # Raw ASGI headers for serving the body below the router
+        etag = self.etag.encode("latin-1")
+        self.raw_headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(self.body)).encode("latin-1")),
+            (b"etag", etag),
+        ]
+        self.raw_not_modified_headers = [(b"etag", etag)]
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Check an If-None-Match header value against the ETag"""
+        if not if_none_match:
+            return False
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or self.etag in candidates
+
+    def response(self, if_none_match: Optional[str] = None) -> Response:
+        """Build the 200 (or 304 Not Modified) response"""
+        if self.matches(if_none_match):
+            return Response(status_code=304, headers=self._headers)
+        return Response(content=self.body, media_type="application/json", headers=self._headers)
@@ -1,22 +1,22 @@
 ﻿"""
 Channel management endpoints
 """
-from fastapi import APIRouter, Depends, Query, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Query, HTTPException, status
 from sqlalchemy import select, func
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 
-from api.database import get_db
+from api.responses import ORJSONResponse
 from api.schemas import (
     ChannelCreate,
     ChannelUpdate,
     ChannelResponse,
     ChannelListResponse,
     SuccessResponse,
+    ChannelCategory,
 )
 from src.common.logger import get_logger
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = get_logger(__name__)
 
 # Mock channel data (replace with database model)
@@ -56,13 +56,57 @@ channels_db = {
     },
 }
 
+# Valid category values; ChannelCategory members hash and compare equal to
+# their values, so both are checked with one set lookup
+_CHANNEL_CATEGORY_VALUES = frozenset(category.value for category in ChannelCategory)
+
+def _category_key(category: str) -> str:
+    """Validate a channel category (member or raw value) for use as an index key"""
+    if category not in _CHANNEL_CATEGORY_VALUES:
+        raise ValueError(f"Invalid channel category: {category!r}")
+    return category
+
+# Secondary indexes over channels_db, kept in sync on create/update/delete
+_by_name: Dict[str, int] = {}
+_by_category: Dict[str, Set[int]] = {}
+_active_ids: Set[int] = set()
+
+# Validated response models, invalidated whenever a channel changes
+_response_cache: Dict[int, ChannelResponse] = {}
+
+def _index_channel(channel: dict) -> None:
+    """Add a channel to the secondary indexes"""
+    channel_id = channel["id"]
+    _by_name[channel["name"]] = channel_id
+    _by_category.setdefault(_category_key(channel["category"]), set()).add(channel_id)
+    if channel["is_active"]:
+        _active_ids.add(channel_id)
+
+def _unindex_channel(channel: dict) -> None:
+    """Remove a channel from the secondary indexes"""
+    channel_id = channel["id"]
+    if _by_name.get(channel["name"]) == channel_id:
+        del _by_name[channel["name"]]
+    _by_category.get(_category_key(channel["category"]), set()).discard(channel_id)
+    _active_ids.discard(channel_id)
+    _response_cache.pop(channel_id, None)
+
+def _channel_response(channel_id: int) -> ChannelResponse:
+    """Get the (cached) response model for a channel"""
+    response = _response_cache.get(channel_id)
+    if response is None:
+        response = _response_cache[channel_id] = ChannelResponse(**channels_db[channel_id])
+    return response
+
+for _channel in channels_db.values():
+    _index_channel(_channel)
+
 @router.get("/channels", response_model=ChannelListResponse)
 async def list_channels(
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(20, ge=1, le=100, description="Number of items to return"),
     category: Optional[str] = Query(None, description="Filter by category"),
     active_only: bool = Query(True, description="Show only active channels"),
-    db: AsyncSession = Depends(get_db)
 ):
     """
     List all channels with pagination and filtering
@@ -73,18 +117,20 @@ async def list_channels(
     - **active_only**: Show only active channels
     """
     try:
-        # Filter channels
-        filtered_channels = []
-        for channel in channels_db.values():
-            if active_only and not channel["is_active"]:
-                continue
-            if category and channel["category"] != category:
-                continue
-            filtered_channels.append(channel)
+        # Filter channels via the secondary indexes
+        if category:
+            channel_ids = _by_category.get(category, set()) if category in _CHANNEL_CATEGORY_VALUES else set()
+            if active_only:
+                channel_ids = channel_ids & _active_ids
+        elif active_only:
+            channel_ids = _active_ids
+        else:
+            channel_ids = channels_db.keys()
+        filtered_ids = sorted(channel_ids)
         
         # Apply pagination
-        total = len(filtered_channels)
-        items = filtered_channels[skip:skip + limit]
+        total = len(filtered_ids)
+        items = filtered_ids[skip:skip + limit]
         
         logger.info(
             "Listed channels",
@@ -95,7 +141,7 @@ async def list_channels(
         )
         
         return ChannelListResponse(
-            items=[ChannelResponse(**item) for item in items],
+            items=[_channel_response(channel_id) for channel_id in items],
             total=total,
             page=skip // limit + 1 if limit > 0 else 1,
             size=limit,
@@ -109,7 +155,6 @@ async def list_channels(
 @router.get("/channels/{channel_id}", response_model=ChannelResponse)
 async def get_channel(
     channel_id: int,
-    db: AsyncSession = Depends(get_db)
 ):
     """
     Get a specific channel by ID
@@ -122,7 +167,7 @@ async def get_channel(
             )
         
         logger.info("Retrieved channel", channel_id=channel_id)
-        return ChannelResponse(**channels_db[channel_id])
+        return _channel_response(channel_id)
         
     except HTTPException:
         raise
@@ -133,7 +178,6 @@ async def get_channel(
 @router.post("/channels", response_model=ChannelResponse)
 async def create_channel(
     channel: ChannelCreate,
-    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new channel
@@ -146,12 +190,11 @@ async def create_channel(
     """
     try:
         # Check if channel name already exists
-        for existing_channel in channels_db.values():
-            if existing_channel["name"] == channel.name:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Channel with name '{channel.name}' already exists"
-                )
+        if channel.name in _by_name:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Channel with name '{channel.name}' already exists"
+            )
         
         # Create new channel
         new_id = max(channels_db.keys()) + 1
@@ -170,9 +213,10 @@ async def create_channel(
         }
         
         channels_db[new_id] = new_channel
+        _index_channel(new_channel)
         
         logger.info("Created new channel", channel_id=new_id, channel_name=channel.name)
-        return ChannelResponse(**new_channel)
+        return _channel_response(new_id)
         
     except HTTPException:
         raise
@@ -184,7 +228,6 @@ async def create_channel(
 async def update_channel(
     channel_id: int,
     channel_update: ChannelUpdate,
-    db: AsyncSession = Depends(get_db)
 ):
     """
     Update an existing channel
@@ -200,14 +243,24 @@ async def update_channel(
         channel = channels_db[channel_id]
         update_data = channel_update.dict(exclude_unset=True)
         
+        # Renaming onto another channel's name would clobber its _by_name entry
+        new_name = update_data.get("name")
+        if new_name is not None and _by_name.get(new_name, channel_id) != channel_id:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Channel with name '{new_name}' already exists"
+            )
+        
+        _unindex_channel(channel)
         for field, value in update_data.items():
             if value is not None:
                 channel[field] = value
         
         channel["updated_at"] = "2024-01-18T00:00:00"  # In real implementation, use datetime.utcnow()
+        _index_channel(channel)
         
         logger.info("Updated channel", channel_id=channel_id, updates=update_data)
-        return ChannelResponse(**channel)
+        return _channel_response(channel_id)
         
     except HTTPException:
         raise
@@ -218,7 +271,6 @@ async def update_channel(
 @router.delete("/channels/{channel_id}", response_model=SuccessResponse)
 async def delete_channel(
     channel_id: int,
-    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a channel (soft delete by marking as inactive)
@@ -234,6 +286,8 @@ async def delete_channel(
         channel = channels_db[channel_id]
         channel["is_active"] = False
         channel["updated_at"] = "2024-01-18T00:00:00"
+        _active_ids.discard(channel_id)
+        _response_cache.pop(channel_id, None)
         
         logger.info("Deleted channel", channel_id=channel_id)
         return SuccessResponse(
@@ -251,24 +305,20 @@ async def delete_channel(
 @router.get("/channels/{channel_name}/stats")
 async def get_channel_stats(
     channel_name: str,
-    db: AsyncSession = Depends(get_db)
 ):
     """
     Get statistics for a specific channel
     """
     try:
         # Find channel by name
-        channel = None
-        for ch in channels_db.values():
-            if ch["name"] == channel_name:
-                channel = ch
-                break
+        channel_id = _by_name.get(channel_name)
         
-        if not channel:
+        if channel_id is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Channel '{channel_name}' not found"
             )
+        channel = channels_db[channel_id]
         
         # Mock statistics (replace with actual database queries)
         stats = {
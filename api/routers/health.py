@@ -1,73 +1,141 @@
 ﻿"""
 Health check endpoints
 """
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter
+from fastapi.responses import Response
 from sqlalchemy import text
-from datetime import datetime
+import asyncio
 import time
 import psutil
 import os
 
-from api.database import get_db
+from api.clock import iso_now, utc_now
+from api.database import get_engine
+from api.responses import ORJSONResponse, dumps
 from api.schemas import HealthResponse
 from src.common.config import settings
 from src.common.logger import get_logger
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = get_logger(__name__)
 
 # Application start time
 START_TIME = time.time()
 
+# Process handle is created once; psutil readings are sampled at most every
+# SYSTEM_STATS_TTL seconds no matter how often probes hit the endpoints
+PROCESS = psutil.Process(os.getpid())
+PROCESS_NAME = PROCESS.name()
+SYSTEM_STATS_TTL = 30
+
+_system_stats_cache = {"ts": 0.0, "data": None}
+
+def _read_system_stats() -> dict:
+    """Read process/system stats from psutil (blocking; walks /proc)"""
+    with PROCESS.oneshot():
+        stats = {
+            "memory_mb": PROCESS.memory_info().rss / 1024 / 1024,
+            "process_cpu_percent": PROCESS.cpu_percent(),
+            "threads": PROCESS.num_threads(),
+        }
+    stats["cpu_percent"] = psutil.cpu_percent(interval=None)
+    stats["memory_percent"] = psutil.virtual_memory().percent
+    return stats
+
+async def _sampled_system_stats(ttl: float = SYSTEM_STATS_TTL) -> dict:
+    """Get process/system psutil readings, refreshed at most once per `ttl` seconds
+    
+    Refreshes run in a worker thread so the event loop keeps serving requests.
+    """
+    now = time.monotonic()
+    if _system_stats_cache["data"] is None or now - _system_stats_cache["ts"] > ttl:
+        stats = await asyncio.to_thread(_read_system_stats)
+        _system_stats_cache.update(ts=now, data=stats)
+    return _system_stats_cache["data"]
+
+# Upper bound on the /health database probe, including connection checkout
+DB_PROBE_TIMEOUT = 0.5
+
+def _pool_status() -> dict:
+    """Get connection pool counters without touching the database"""
+    pool = get_engine().pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+async def _probe_database(pool_status: dict) -> bool:
+    """Run SELECT 1 within DB_PROBE_TIMEOUT, unless the pool is saturated"""
+    # Every pooled connection is busy serving requests, so the database is
+    # reachable; don't queue behind them or open an overflow connection
+    if pool_status["checked_out"] >= pool_status["size"]:
+        return True
+
+    async def select_one() -> bool:
+        async with get_engine().connect() as conn:
+            result = await conn.execute(text("SELECT 1"))
+            return result.scalar() == 1
+
+    try:
+        return await asyncio.wait_for(select_one(), timeout=DB_PROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Database health check timed out", timeout=DB_PROBE_TIMEOUT)
+    except Exception as e:
+        logger.warning("Database health check failed", error=str(e))
+    return False
+
 @router.get("/health", response_model=HealthResponse)
-async def health_check(db: AsyncSession = Depends(get_db)):
+async def health_check():
     """
     Health check endpoint
     Returns API health status and database connectivity
     """
     # Check database
-    db_healthy = False
-    try:
-        result = await db.execute(text("SELECT 1"))
-        db_healthy = result.scalar() == 1
-    except Exception as e:
-        logger.warning("Database health check failed", error=str(e))
+    pool_status = _pool_status()
+    db_healthy = await _probe_database(pool_status)
     
     # Get system info
-    process = psutil.Process(os.getpid())
-    memory_usage = process.memory_info().rss / 1024 / 1024  # MB
+    memory_usage = (await _sampled_system_stats())["memory_mb"]
     
     return HealthResponse(
         status="healthy" if db_healthy else "unhealthy",
-        timestamp=datetime.utcnow(),
+        timestamp=utc_now(),
         version=settings.VERSION,
         database=db_healthy,
+        pool=pool_status,
         memory_usage_mb=memory_usage,
         uptime_seconds=time.time() - START_TIME,
     )
 
+async def _database_version() -> str:
+    """Get the server version over a short-lived engine connection"""
+    async with get_engine().connect() as conn:
+        result = await conn.execute(text("SELECT version()"))
+        return result.scalar()
+
 @router.get("/health/detailed")
-async def detailed_health_check(db: AsyncSession = Depends(get_db)):
+async def detailed_health_check():
     """
     Detailed health check with system information
     """
-    # Database check
+    # Database check (a connection is only checked out for this query)
     db_healthy = False
     db_version = "unknown"
     try:
-        result = await db.execute(text("SELECT version()"))
-        db_version = result.scalar()
+        db_version = await asyncio.wait_for(_database_version(), timeout=DB_PROBE_TIMEOUT)
         db_healthy = True
+    except asyncio.TimeoutError:
+        db_version = f"error: timed out after {DB_PROBE_TIMEOUT}s"
     except Exception as e:
         db_version = f"error: {str(e)}"
     
     # System info
     import platform
-    process = psutil.Process(os.getpid())
+    system_stats = await _sampled_system_stats()
     
     return {
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": iso_now(),
         "application": {
             "name": settings.PROJECT_NAME,
             "version": settings.VERSION,
@@ -82,21 +150,31 @@ async def detailed_health_check(db: AsyncSession = Depends(get_db)):
             "platform": platform.system(),
             "release": platform.release(),
             "python_version": platform.python_version(),
-            "cpu_percent": psutil.cpu_percent(),
-            "memory_percent": psutil.virtual_memory().percent,
+            "cpu_percent": system_stats["cpu_percent"],
+            "memory_percent": system_stats["memory_percent"],
         },
         "process": {
-            "pid": process.pid,
-            "name": process.name(),
-            "memory_mb": process.memory_info().rss / 1024 / 1024,
-            "cpu_percent": process.cpu_percent(),
-            "threads": process.num_threads(),
+            "pid": PROCESS.pid,
+            "name": PROCESS_NAME,
+            "memory_mb": system_stats["memory_mb"],
+            "cpu_percent": system_stats["process_cpu_percent"],
+            "threads": system_stats["threads"],
         },
     }
 
+# Pre-serialized ping body, re-rendered at most once per second
+_ping_cache = {"ts": 0.0, "body": b""}
+
 @router.get("/health/ping")
 async def ping():
     """
     Simple ping endpoint
     """
-    return {"ping": "pong", "timestamp": datetime.utcnow().isoformat()}
+    now = time.monotonic()
+    if now - _ping_cache["ts"] >= 1.0:
+        _ping_cache.update(
+            ts=now,
+            body=dumps({"ping": "pong", "timestamp": iso_now()}),
+        )
+    return Response(content=_ping_cache["body"], media_type="application/json")
+
@@ -1,14 +1,18 @@
 ﻿"""
 Reports and analytics endpoints
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, select, and_, or_
-from datetime import datetime, date, timedelta
+from fastapi import APIRouter, Query, HTTPException
+from sqlalchemy import Date, and_, cast, func, literal_column, select, tuple_
+from datetime import date, timedelta
+import logging
 import time
-from typing import Optional, List
 
-from api.database import get_db
+from api.cache import ttl_cache
+from api.clock import iso_now, utc_now
+from api.config import settings
+from api.database import get_session_factory
+from api.models.detection import RawImageDetection
+from api.responses import ORJSONResponse
 from api.schemas import (
     ReportRequest,
     ReportResponse,
@@ -17,37 +21,181 @@ from api.schemas import (
     ObjectStats,
     TimeSeriesPoint,
     TimeRange,
-    ChannelCategory,
     ObjectCategory,
 )
 from src.common.logger import get_logger
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = get_logger(__name__)
 
-# Mock data models (replace with actual models from database)
-class Detection:
-    """Mock detection model"""
-    @classmethod
-    async def get_stats(cls, db: AsyncSession, filters: dict) -> dict:
-        """Get detection statistics"""
-        # This is a mock implementation
-        # Replace with actual database queries
-        return {
-            "total_detections": 1250,
-            "unique_images": 450,
-            "unique_channels": 3,
-            "unique_objects": 8,
-            "avg_confidence": 0.78,
-            "high_confidence_count": 890,
-            "high_confidence_percent": 71.2,
+# Number of objects returned in a report's top_objects
+TOP_OBJECTS_LIMIT = 10
+
+# GROUPING(channel_name, detected_class, bucket) bitmask for each grouping
+# set; a bit is set when that column is aggregated over
+_SUMMARY = 0b111
+_BY_CHANNEL = 0b011
+_BY_OBJECT = 0b101
+_BY_OBJECT_CHANNEL = 0b001
+_BY_BUCKET = 0b110
+
+def _report_query(req: dict):
+    """
+    Build the single aggregate query behind a report
+    
+    One GROUPING SETS scan over raw_image_detections yields the summary,
+    per-channel, per-object, per-object-and-channel and per-bucket rows,
+    tagged by their GROUPING() bitmask.
+    """
+    d = RawImageDetection
+    # TimeRange values are valid date_trunc() units; inline the unit so the
+    # SELECT and GROUP BY expressions are identical. date_trunc() returns
+    # timestamptz, so cast back to date in SQL rather than calling .date()
+    # on a value the session TimeZone may have shifted
+    bucket = cast(
+        func.date_trunc(
+            literal_column(f"'{TimeRange(req['time_range']).value}'"),
+            cast(d.date_str, Date),
+        ),
+        Date,
+    ).label("bucket")
+    
+    conditions = [
+        d.date_str >= req["start_date"].isoformat(),
+        d.date_str <= req["end_date"].isoformat(),
+    ]
+    if req["channel_names"]:
+        conditions.append(d.channel_name.in_(req["channel_names"]))
+    if req["object_categories"]:
+        conditions.append(
+            d.product_category.in_([ObjectCategory(c).value for c in req["object_categories"]])
+        )
+    
+    return (
+        select(
+            func.grouping(d.channel_name, d.detected_class, bucket).label("grouping_id"),
+            d.channel_name,
+            d.detected_class,
+            bucket,
+            func.count().label("detection_count"),
+            func.count(d.image_name.distinct()).label("unique_images"),
+            func.count(d.channel_name.distinct()).label("unique_channels"),
+            func.count(d.detected_class.distinct()).label("unique_objects"),
+            func.avg(d.confidence).label("avg_confidence"),
+            func.count().filter(d.confidence_level == "high").label("high_confidence_count"),
+            func.count().filter(d.product_category == "medical").label("medical_count"),
+            func.count().filter(d.product_category == "cosmetic").label("cosmetic_count"),
+            func.max(d.product_category).label("product_category"),
+        )
+        .where(and_(*conditions))
+        .group_by(
+            func.grouping_sets(
+                tuple_(),
+                tuple_(d.channel_name),
+                tuple_(d.detected_class),
+                tuple_(d.detected_class, d.channel_name),
+                tuple_(bucket),
+            )
+        )
+    )
+
+# Summary reported when no detections match the filters
+_EMPTY_SUMMARY = {
+    "total_detections": 0,
+    "unique_images": 0,
+    "unique_channels": 0,
+    "unique_objects": 0,
+    "avg_confidence": 0.0,
+    "high_confidence_count": 0,
+    "high_confidence_percent": 0.0,
+}
+
+def _percent(part: int, total: int) -> float:
+    """Get part / total as a percentage rounded to one decimal"""
+    return round(100.0 * part / total, 1) if total else 0.0
+
+def _build_report(rows) -> dict:
+    """
+    Split the grouping-set rows into the report sections
+    
+    Rows come from our own query, so models use construct() and skip validation.
+    """
+    summary = None
+    channels, objects, time_series = [], [], []
+    channel_distribution = {}
+    for row in rows:
+        if row.grouping_id == _SUMMARY:
+            summary = row
+        elif row.grouping_id == _BY_CHANNEL:
+            channels.append(
+                ChannelStats.construct(
+                    channel_name=row.channel_name,
+                    category=None,
+                    detection_count=row.detection_count,
+                    unique_objects=row.unique_objects,
+                    avg_confidence=float(row.avg_confidence),
+                    medical_percent=_percent(row.medical_count, row.detection_count),
+                    cosmetic_percent=_percent(row.cosmetic_count, row.detection_count),
+                )
+            )
+        elif row.grouping_id == _BY_OBJECT:
+            objects.append(row)
+        elif row.grouping_id == _BY_OBJECT_CHANNEL:
+            channel_distribution.setdefault(row.detected_class, {})[row.channel_name] = row.detection_count
+        elif row.grouping_id == _BY_BUCKET:
+            time_series.append(
+                TimeSeriesPoint.construct(
+                    date=row.bucket,
+                    count=row.detection_count,
+                    avg_confidence=float(row.avg_confidence),
+                )
+            )
+    
+    if summary is not None and summary.detection_count:
+        summary_stats = {
+            "total_detections": summary.detection_count,
+            "unique_images": summary.unique_images,
+            "unique_channels": summary.unique_channels,
+            "unique_objects": summary.unique_objects,
+            "avg_confidence": float(summary.avg_confidence),
+            "high_confidence_count": summary.high_confidence_count,
+            "high_confidence_percent": _percent(
+                summary.high_confidence_count, summary.detection_count
+            ),
         }
+    else:
+        summary_stats = dict(_EMPTY_SUMMARY)
+    
+    objects.sort(key=lambda row: row.detection_count, reverse=True)
+    top_objects = [
+        ObjectStats.construct(
+            object_name=row.detected_class,
+            category=ObjectCategory(row.product_category or ObjectCategory.OTHER.value),
+            detection_count=row.detection_count,
+            unique_channels=row.unique_channels,
+            avg_confidence=float(row.avg_confidence),
+            channel_distribution=channel_distribution.get(row.detected_class, {}),
+        )
+        for row in objects[:TOP_OBJECTS_LIMIT]
+    ]
+    channels.sort(key=lambda stats: stats.detection_count, reverse=True)
+    time_series.sort(key=lambda point: point.date)
+    
+    return {
+        "summary": summary_stats,
+        "channels": channels,
+        "top_objects": top_objects,
+        "time_series": time_series,
+    }
+
+async def _fetch_report(req: dict) -> dict:
+    """Run the report query in one round-trip and build the report sections"""
+    async with get_session_factory()() as session:
+        result = await session.execute(_report_query(req))
+        return _build_report(result.all())
 
 @router.post("/reports/generate", response_model=ReportResponse)
-async def generate_report(
-    report_request: ReportRequest,
-    db: AsyncSession = Depends(get_db)
-):
+async def generate_report(report_request: ReportRequest):
     """
     Generate analytics report for detections
     
@@ -66,128 +214,34 @@ async def generate_report(
     if not report_request.end_date:
         report_request.end_date = date.today()
     
-    logger.info(
-        "Generating report",
-        start_date=report_request.start_date,
-        end_date=report_request.end_date,
-        channel_count=len(report_request.channel_names or []),
-        object_categories=report_request.object_categories,
-    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Generating report",
+            start_date=report_request.start_date,
+            end_date=report_request.end_date,
+            channel_count=len(report_request.channel_names or []),
+            object_categories=report_request.object_categories,
+        )
+    req_dict = report_request.dict()
     
     try:
-        # Get summary statistics
-        summary_stats = await Detection.get_stats(db, report_request.dict())
-        
-        # Get channel statistics (mock data)
-        channel_stats = [
-            ChannelStats(
-                channel_name="chemed_pharmacy",
-                category=ChannelCategory.MEDICAL,
-                detection_count=650,
-                unique_objects=5,
-                avg_confidence=0.82,
-                medical_percent=85.4,
-                cosmetic_percent=12.3,
-            ),
-            ChannelStats(
-                channel_name="lobelia_cosmetics",
-                category=ChannelCategory.COSMETIC,
-                detection_count=350,
-                unique_objects=4,
-                avg_confidence=0.75,
-                medical_percent=8.7,
-                cosmetic_percent=88.9,
-            ),
-            ChannelStats(
-                channel_name="tikvah_pharma",
-                category=ChannelCategory.MEDICAL,
-                detection_count=250,
-                unique_objects=3,
-                avg_confidence=0.81,
-                medical_percent=92.1,
-                cosmetic_percent=5.4,
-            ),
-        ]
-        
-        # Get top objects (mock data)
-        top_objects = [
-            ObjectStats(
-                object_name="bottle",
-                category=ObjectCategory.PACKAGING,
-                detection_count=420,
-                unique_channels=3,
-                avg_confidence=0.85,
-                channel_distribution={
-                    "chemed_pharmacy": 180,
-                    "lobelia_cosmetics": 150,
-                    "tikvah_pharma": 90,
-                },
-            ),
-            ObjectStats(
-                object_name="medicine",
-                category=ObjectCategory.MEDICAL,
-                detection_count=380,
-                unique_channels=2,
-                avg_confidence=0.79,
-                channel_distribution={
-                    "chemed_pharmacy": 250,
-                    "tikvah_pharma": 130,
-                },
-            ),
-            ObjectStats(
-                object_name="cream",
-                category=ObjectCategory.COSMETIC,
-                detection_count=210,
-                unique_channels=1,
-                avg_confidence=0.72,
-                channel_distribution={
-                    "lobelia_cosmetics": 210,
-                },
-            ),
-        ]
+        report = await _fetch_report(req_dict)
+        summary_stats = report["summary"]
         
-        # Generate time series data (mock data)
-        time_series = []
-        current_date = report_request.start_date
-        while current_date <= report_request.end_date:
-            # Mock data generation
-            count = 40 + (hash(str(current_date)) % 20)  # Randomish count
-            avg_confidence = 0.7 + (hash(str(current_date)) % 30) / 100
-            
-            time_series.append(
-                TimeSeriesPoint(
-                    date=current_date,
-                    count=count,
-                    avg_confidence=avg_confidence,
-                )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Report generated successfully",
+                processing_time_ms=(time.time() - start_time) * 1000,
+                summary_stats=summary_stats,
             )
-            
-            # Move to next day
-            if report_request.time_range == TimeRange.DAY:
-                current_date += timedelta(days=1)
-            elif report_request.time_range == TimeRange.WEEK:
-                current_date += timedelta(weeks=1)
-            elif report_request.time_range == TimeRange.MONTH:
-                # Approximate month increment
-                year = current_date.year + (current_date.month // 12)
-                month = (current_date.month % 12) + 1
-                current_date = current_date.replace(year=year, month=month)
-        
-        processing_time = time.time() - start_time
-        
-        logger.info(
-            "Report generated successfully",
-            processing_time_ms=processing_time * 1000,
-            summary_stats=summary_stats,
-        )
         
         return ReportResponse(
-            summary=DetectionStats(**summary_stats),
-            channels=channel_stats,
-            top_objects=top_objects,
-            time_series=time_series,
-            generated_at=datetime.utcnow(),
-            parameters=report_request.dict(),
+            summary=DetectionStats.construct(**summary_stats),
+            channels=report["channels"],
+            top_objects=report["top_objects"],
+            time_series=report["time_series"],
+            generated_at=utc_now(),
+            parameters=req_dict,
         )
         
     except Exception as e:
@@ -195,9 +249,9 @@ async def generate_report(
         raise HTTPException(status_code=500, detail=f"Failed to generate report: {str(e)}")
 
 @router.get("/reports/summary")
+@ttl_cache(settings.REPORTS_CACHE_TTL)
 async def get_summary_report(
-    days: int = Query(30, ge=1, le=365, description="Number of days to include"),
-    db: AsyncSession = Depends(get_db)
+    days: int = Query(30, ge=1, le=365, description="Number of days to include")
 ):
     """
     Get quick summary report for the last N days
@@ -214,17 +268,17 @@ async def get_summary_report(
             "high_confidence_percent": 71.2,
             "medical_percent": 65.8,
             "cosmetic_percent": 31.4,
-            "generated_at": datetime.utcnow().isoformat(),
+            "generated_at": iso_now(),
         }
     except Exception as e:
         logger.error("Failed to get summary report", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to get summary report")
 
 @router.get("/reports/channel/{channel_name}")
+@ttl_cache(settings.REPORTS_CACHE_TTL)
 async def get_channel_report(
     channel_name: str,
     days: int = Query(30, ge=1, le=365),
-    db: AsyncSession = Depends(get_db)
 ):
     """
     Get detailed report for a specific channel
@@ -250,17 +304,17 @@ async def get_channel_report(
                 "low": 20,
             },
             "daily_trend": [40, 42, 38, 45, 39, 41, 43],  # Last 7 days
-            "generated_at": datetime.utcnow().isoformat(),
+            "generated_at": iso_now(),
         }
     except Exception as e:
         logger.error(f"Failed to get channel report for {channel_name}", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to get channel report")
 
 @router.get("/reports/object/{object_name}")
+@ttl_cache(settings.REPORTS_CACHE_TTL)
 async def get_object_report(
     object_name: str,
     days: int = Query(30, ge=1, le=365),
-    db: AsyncSession = Depends(get_db)
 ):
     """
     Get detailed report for a specific object
@@ -279,7 +333,7 @@ async def get_object_report(
                 "tikvah_pharma": 90,
             },
             "confidence_trend": [0.84, 0.85, 0.86, 0.84, 0.85, 0.83, 0.86],
-            "generated_at": datetime.utcnow().isoformat(),
+            "generated_at": iso_now(),
         }
     except Exception as e:
         logger.error(f"Failed to get object report for {object_name}", error=str(e))
@@ -1,13 +1,16 @@
 ﻿"""
 Search endpoints for detections
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Header, Query, HTTPException
+import logging
 import time
 from datetime import datetime, date
-from typing import List, Optional
+from typing import Dict, List, Optional
+import numpy as np
 
-from api.database import get_db
+from api.clock import iso_now
+from api.database import search_messages
+from api.responses import ORJSONResponse, StaticJSON
 from api.schemas import (
     SearchRequest,
     SearchResponse,
@@ -15,7 +18,7 @@ from api.schemas import (
 )
 from src.common.logger import get_logger
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = get_logger(__name__)
 
 # Mock search data (replace with database queries)
@@ -67,10 +70,32 @@ mock_detections = [
     },
 ]
 
+# Typed record array over mock_detections, built once so search filters run
+# as vectorized mask operations on fixed-width fields instead of dict lookups
+_det_channel = np.array([d["channel_name"] for d in mock_detections])
+# Channel filter compares small integer codes instead of strings
+_channel_names, _det_channel_code = np.unique(_det_channel, return_inverse=True)
+_channel_codes = {name: code for code, name in enumerate(_channel_names.tolist())}
+_detections = np.rec.fromarrays(
+    [
+        np.array([d["detected_class"].lower() for d in mock_detections]),
+        np.char.lower(_det_channel),
+        _det_channel_code.astype(np.int32),
+        np.array(
+            [datetime.fromisoformat(d["detection_date"]).date() for d in mock_detections],
+            dtype="datetime64[D]",
+        ),
+        np.array([d["confidence"] for d in mock_detections], dtype=np.float64),
+    ],
+    names="class_lower,channel_lower,channel_code,date,confidence",
+)
+
+# Validated once here; searches return these instances by index
+_search_results = [SearchResult(**d) for d in mock_detections]
+
 @router.post("/search", response_model=SearchResponse)
 async def search_detections(
     search_request: SearchRequest,
-    db: AsyncSession = Depends(get_db)
 ):
     """
     Search detections with advanced filtering
@@ -87,68 +112,72 @@ async def search_detections(
     start_time = time.time()
     
     try:
-        logger.info(
-            "Searching detections",
-            query=search_request.query,
-            filters={
-                "channel_names": search_request.channel_names,
-                "start_date": search_request.start_date,
-                "end_date": search_request.end_date,
-                "min_confidence": search_request.min_confidence,
-                "max_confidence": search_request.max_confidence,
-            },
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Searching detections",
+                query=search_request.query,
+                filters={
+                    "channel_names": search_request.channel_names,
+                    "start_date": search_request.start_date,
+                    "end_date": search_request.end_date,
+                    "min_confidence": search_request.min_confidence,
+                    "max_confidence": search_request.max_confidence,
+                },
+            )
         
         # Apply filters to mock data
-        filtered_results = []
+        mask = np.ones(len(_detections), dtype=bool)
+        
+        # Apply query filter
+        query_lower = search_request.query.lower()
+        if query_lower:
+            mask &= (np.char.find(_detections.class_lower, query_lower) >= 0) | (
+                np.char.find(_detections.channel_lower, query_lower) >= 0
+            )
+        
+        # Apply channel filter
+        if search_request.channel_names:
+            wanted = {
+                _channel_codes[name]
+                for name in frozenset(search_request.channel_names)
+                if name in _channel_codes
+            }
+            mask &= np.isin(_detections.channel_code, list(wanted))
+        
+        # Apply date filter
+        if search_request.start_date:
+            mask &= _detections.date >= np.datetime64(search_request.start_date)
+        
+        if search_request.end_date:
+            mask &= _detections.date <= np.datetime64(search_request.end_date)
+        
+        # Apply confidence filter
+        if search_request.min_confidence:
+            mask &= _detections.confidence >= search_request.min_confidence
         
-        for detection in mock_detections:
-            # Apply query filter
-            query_lower = search_request.query.lower()
-            if query_lower and query_lower not in detection["detected_class"].lower() and query_lower not in detection["channel_name"].lower():
-                continue
-            
-            # Apply channel filter
-            if search_request.channel_names and detection["channel_name"] not in search_request.channel_names:
-                continue
-            
-            # Apply date filter
-            if search_request.start_date:
-                detection_date = datetime.fromisoformat(detection["detection_date"]).date()
-                if detection_date < search_request.start_date:
-                    continue
-            
-            if search_request.end_date:
-                detection_date = datetime.fromisoformat(detection["detection_date"]).date()
-                if detection_date > search_request.end_date:
-                    continue
-            
-            # Apply confidence filter
-            if search_request.min_confidence and detection["confidence"] < search_request.min_confidence:
-                continue
-            
-            if search_request.max_confidence and detection["confidence"] > search_request.max_confidence:
-                continue
-            
-            filtered_results.append(detection)
+        if search_request.max_confidence:
+            mask &= _detections.confidence <= search_request.max_confidence
         
-        # Apply pagination
-        total = len(filtered_results)
-        paginated_results = filtered_results[
-            search_request.offset:search_request.offset + search_request.limit
+        # Apply pagination, materializing only the returned rows
+        matches = np.flatnonzero(mask)
+        total = int(matches.size)
+        paginated_results = [
+            _search_results[i]
+            for i in matches[search_request.offset:search_request.offset + search_request.limit]
         ]
         
         search_time = (time.time() - start_time) * 1000
         
-        logger.info(
-            "Search completed",
-            results_found=total,
-            results_returned=len(paginated_results),
-            search_time_ms=search_time,
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Search completed",
+                results_found=total,
+                results_returned=len(paginated_results),
+                search_time_ms=search_time,
+            )
         
         return SearchResponse(
-            results=[SearchResult(**result) for result in paginated_results],
+            results=paginated_results,
             total=total,
             query=search_request.query,
             search_time_ms=search_time,
@@ -158,11 +187,39 @@ async def search_detections(
         logger.error("Search failed", error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+# Quick-search vocabulary (mock; replace with database values)
+QUICK_SEARCH_CHANNELS = ["chemed_pharmacy", "lobelia_cosmetics", "tikvah_pharma"]
+QUICK_SEARCH_OBJECTS = ["medicine", "bottle", "cream", "syringe", "box", "ointment", "pill"]
+
+def _build_suggestion_index() -> Dict[str, List[dict]]:
+    """
+    Map every lowercase substring of each name to its suggestions
+    
+    Lookups are a single dict hit instead of a scan over all names; each
+    list keeps channels before objects in vocabulary order.
+    """
+    index: Dict[str, List[dict]] = {}
+    vocabulary = [("channel", "Channel", name) for name in QUICK_SEARCH_CHANNELS] + [
+        ("object", "Object", name) for name in QUICK_SEARCH_OBJECTS
+    ]
+    for kind, label, name in vocabulary:
+        suggestion = {"type": kind, "value": name, "label": f"{label}: {name}"}
+        name_lower = name.lower()
+        substrings = {
+            name_lower[i:j]
+            for i in range(len(name_lower))
+            for j in range(i + 1, len(name_lower) + 1)
+        }
+        for substring in substrings:
+            index.setdefault(substring, []).append(suggestion)
+    return index
+
+_SUGGESTION_INDEX = _build_suggestion_index()
+
 @router.get("/search/quick")
 async def quick_search(
     q: str = Query(..., min_length=1, description="Search query"),
     limit: int = Query(10, ge=1, le=50, description="Maximum results"),
-    db: AsyncSession = Depends(get_db)
 ):
     """
     Quick search with autocomplete suggestions
@@ -172,74 +229,74 @@ async def quick_search(
     """
     try:
         # Mock implementation - in real app, search database
-        suggestions = []
-        
-        # Search in channel names
-        channels = ["chemed_pharmacy", "lobelia_cosmetics", "tikvah_pharma"]
-        for channel in channels:
-            if q.lower() in channel.lower():
-                suggestions.append({
-                    "type": "channel",
-                    "value": channel,
-                    "label": f"Channel: {channel}",
-                })
-        
-        # Search in object names
-        objects = ["medicine", "bottle", "cream", "syringe", "box", "ointment", "pill"]
-        for obj in objects:
-            if q.lower() in obj.lower():
-                suggestions.append({
-                    "type": "object",
-                    "value": obj,
-                    "label": f"Object: {obj}",
-                })
-        
-        # Limit results
-        suggestions = suggestions[:limit]
+        suggestions = _SUGGESTION_INDEX.get(q.lower(), [])[:limit]
         
         return {
             "query": q,
             "suggestions": suggestions,
             "count": len(suggestions),
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": iso_now(),
         }
         
     except Exception as e:
         logger.error("Quick search failed", error=str(e))
         raise HTTPException(status_code=500, detail="Quick search failed")
 
-@router.get("/search/filters")
-async def get_search_filters(db: AsyncSession = Depends(get_db)):
+@router.get("/search/messages")
+async def search_message_text(
+    q: str = Query(..., min_length=1, description="Words or exact hashtag to find"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum results"),
+):
     """
-    Get available filters for search
+    Full-text and hashtag search over stored messages
+    
+    - **q**: Words matched against the message text, or an exact hashtag
+    - **limit**: Maximum number of messages, newest first
     """
     try:
-        # Mock implementation - in real app, get from database
-        return {
-            "channels": [
-                {"name": "chemed_pharmacy", "display_name": "Chemed Pharmacy", "count": 650},
-                {"name": "lobelia_cosmetics", "display_name": "Lobelia Cosmetics", "count": 350},
-                {"name": "tikvah_pharma", "display_name": "Tikvah Pharma", "count": 250},
-            ],
-            "objects": [
-                {"name": "bottle", "category": "packaging", "count": 420},
-                {"name": "medicine", "category": "medical", "count": 380},
-                {"name": "cream", "category": "cosmetic", "count": 210},
-                {"name": "box", "category": "packaging", "count": 180},
-                {"name": "syringe", "category": "medical", "count": 120},
-            ],
-            "confidence_ranges": [
-                {"min": 0.9, "max": 1.0, "label": "Very High (90-100%)"},
-                {"min": 0.8, "max": 0.9, "label": "High (80-90%)"},
-                {"min": 0.6, "max": 0.8, "label": "Medium (60-80%)"},
-                {"min": 0.0, "max": 0.6, "label": "Low (0-60%)"},
-            ],
-            "date_range": {
-                "min": "2024-01-01",
-                "max": "2024-01-18",
-            },
-        }
-        
+        rows = await search_messages(q, limit)
     except Exception as e:
-        logger.error("Failed to get search filters", error=str(e))
-        raise HTTPException(status_code=500, detail="Failed to get search filters")
+        logger.error("Message search failed", error=str(e))
+        raise HTTPException(status_code=500, detail="Message search failed")
+    
+    return {
+        "query": q,
+        "messages": [dict(row) for row in rows],
+        "count": len(rows),
+        "timestamp": iso_now(),
+    }
+
+# Search filters never change at runtime (mock), so the body and its ETag
+# are serialized once here
+_SEARCH_FILTERS_JSON = StaticJSON({
+    "channels": [
+        {"name": "chemed_pharmacy", "display_name": "Chemed Pharmacy", "count": 650},
+        {"name": "lobelia_cosmetics", "display_name": "Lobelia Cosmetics", "count": 350},
+        {"name": "tikvah_pharma", "display_name": "Tikvah Pharma", "count": 250},
+    ],
+    "objects": [
+        {"name": "bottle", "category": "packaging", "count": 420},
+        {"name": "medicine", "category": "medical", "count": 380},
+        {"name": "cream", "category": "cosmetic", "count": 210},
+        {"name": "box", "category": "packaging", "count": 180},
+        {"name": "syringe", "category": "medical", "count": 120},
+    ],
+    "confidence_ranges": [
+        {"min": 0.9, "max": 1.0, "label": "Very High (90-100%)"},
+        {"min": 0.8, "max": 0.9, "label": "High (80-90%)"},
+        {"min": 0.6, "max": 0.8, "label": "Medium (60-80%)"},
+        {"min": 0.0, "max": 0.6, "label": "Low (0-60%)"},
+    ],
+    "date_range": {
+        "min": "2024-01-01",
+        "max": "2024-01-18",
+    },
+})
+
+@router.get("/search/filters")
+async def get_search_filters(if_none_match: Optional[str] = Header(None)):
+    """
+    Get available filters for search
+    """
+    # Mock implementation - in real app, get from database
+    return _SEARCH_FILTERS_JSON.response(if_none_match)
@@ -35,6 +35,7 @@ class HealthResponse(BaseModel):
     timestamp: datetime
     version: str
     database: bool
+    pool: Optional[Dict[str, int]] = None
 
 # Report schemas
 class ReportRequest(BaseModel):
@@ -1,180 +1,369 @@
-import json
+import io
+import mmap
+import orjson
 import psycopg2
+from multiprocessing import Pool
+from multiprocessing.util import Finalize
+from textwrap import indent
 import os
 import glob
 from datetime import datetime
 
-def load_telegram_data():
-    """Load Telegram data with correct field names"""
-    
-    print("📥 Loading Telegram data into PostgreSQL...")
-    
-    # Connect to PostgreSQL
-    conn = psycopg2.connect(
-        host="localhost",
-        port=5432,
-        database="medical_warehouse",
-        user="admin",
-        password="admin123"
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL
+
+DB_CONFIG = dict(
+    host="localhost",
+    port=5432,
+    database="medical_warehouse",
+    user="admin",
+    password="admin123"
+)
+DB_URL = URL.create(
+    "postgresql+psycopg2",
+    username=DB_CONFIG["user"],
+    password=DB_CONFIG["password"],
+    host=DB_CONFIG["host"],
+    port=DB_CONFIG["port"],
+    database=DB_CONFIG["database"],
+)
+BASE_DIR = os.path.join('..', 'data', 'raw', 'telegram_messages')
+
+# Columns staged from the JSON files, in COPY order
+STAGE_COLUMNS = (
+    "channel_name", "message_id", "message_text", "message_date",
+    "views", "forwards", "media_path", "hashtags", "raw_json",
+)
+# Rows buffered in memory before each COPY round-trip
+COPY_BATCH_ROWS = 10000
+# Rows per prepared INSERT when COPY staging is unavailable
+INSERT_BATCH_ROWS = 1000
+# Processes parsing files in parallel, each with its own connection
+LOAD_WORKERS = min(8, os.cpu_count() or 1)
+# Files handed to a worker at a time
+LOAD_CHUNKSIZE = 4
+
+# Runs the statement prepared by prepare_insert, one array per column
+EXECUTE_INSERT_SQL = f"EXECUTE tg_ins ({', '.join(['%s'] * len(STAGE_COLUMNS))})"
+# Merge staged rows, keeping the first copy of each message
+MERGE_SQL = f"""
+    INSERT INTO raw_telegram.telegram_messages ({', '.join(STAGE_COLUMNS)})
+    SELECT DISTINCT ON (channel_name, message_id) {', '.join(STAGE_COLUMNS)}
+    FROM tg_stage
+    ORDER BY channel_name, message_id, stage_row
+    ON CONFLICT (channel_name, message_id) DO NOTHING
+"""
+
+# Files already ingested, keyed by path relative to BASE_DIR
+LEDGER_DDL = """
+    CREATE TABLE IF NOT EXISTS raw_telegram.ingest_ledger (
+        path TEXT PRIMARY KEY,
+        mtime DOUBLE PRECISION NOT NULL,
+        rows INTEGER NOT NULL
     )
-    conn.autocommit = True  # Auto-commit each statement
-    cursor = conn.cursor()
-    
-    # Base directory
-    base_dir = os.path.join('..', 'data', 'raw', 'telegram_messages')
+"""
+LEDGER_UPSERT_SQL = """
+    INSERT INTO raw_telegram.ingest_ledger (path, mtime, rows)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (path) DO UPDATE SET mtime = excluded.mtime, rows = excluded.rows
+"""
+
+# This process's connection, opened by the first file it loads
+_worker = {}
+# Pooled engine for the pandas reads, kept across loads in one process
+_engine = None
+
+def copy_field(value):
+    """Format one value for COPY ... FROM STDIN in text format"""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+def create_stage(cursor):
+    """Create the COPY staging table; returns False if it can't be used"""
+    cursor.execute("SAVEPOINT create_stage")
+    try:
+        cursor.execute(f"""
+            CREATE TEMP TABLE tg_stage ON COMMIT DELETE ROWS AS
+            SELECT {', '.join(STAGE_COLUMNS)}
+            FROM raw_telegram.telegram_messages
+            WITH NO DATA
+        """)
+        # Staging order, so the first copy of a duplicated message wins
+        cursor.execute("ALTER TABLE tg_stage ADD COLUMN stage_row BIGSERIAL")
+    except psycopg2.Error as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT create_stage")
+        print(f"   ⚠ COPY staging unavailable ({str(e).strip()}), using batched INSERTs")
+        return False
+    cursor.execute("RELEASE SAVEPOINT create_stage")
+    return True
+
+def prepare_insert(cursor):
+    """Prepare tg_ins, a batched INSERT that is parsed and planned only once"""
+    cursor.execute("""
+        SELECT attname, format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = 'raw_telegram.telegram_messages'::regclass
+        AND attname = ANY(%s)
+    """, (list(STAGE_COLUMNS),))
+    column_types = dict(cursor.fetchall())
     
-    # Get all JSON files
-    json_pattern = os.path.join(base_dir, '**', '*.json')
-    json_files = glob.glob(json_pattern, recursive=True)
+    # Columns arrive as text arrays and are cast to the table's own types
+    params = ', '.join(f'${i}' for i in range(1, len(STAGE_COLUMNS) + 1))
+    casts = ', '.join(f'{column}::{column_types[column]}' for column in STAGE_COLUMNS)
+    cursor.execute(f"""
+        PREPARE tg_ins ({', '.join(['text[]'] * len(STAGE_COLUMNS))}) AS
+        INSERT INTO raw_telegram.telegram_messages ({', '.join(STAGE_COLUMNS)})
+        SELECT {casts}
+        FROM unnest({params}) AS batch ({', '.join(STAGE_COLUMNS)})
+        ON CONFLICT (channel_name, message_id) DO NOTHING
+    """)
+
+def read_json_file(path):
+    """Parse a JSON file in one pass straight from a read-only memory map"""
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+def flush_rows(cursor, rows, use_copy):
+    """Send the buffered rows; returns how many were inserted directly"""
+    if not rows:
+        return 0
+    if use_copy:
+        buf = io.StringIO()
+        for row in rows:
+            buf.write('\t'.join(copy_field(value) for value in row) + '\n')
+        buf.seek(0)
+        cursor.copy_expert(
+            f"COPY tg_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT text)",
+            buf
+        )
+        inserted = 0
+    else:
+        cursor.execute(EXECUTE_INSERT_SQL, [list(column) for column in zip(*rows)])
+        inserted = cursor.rowcount
+    rows.clear()
+    return inserted
+
+def close_worker_conn():
+    """Close this process's connection, if it was ever opened"""
+    conn = _worker.pop('conn', None)
+    if conn is not None:
+        conn.close()
+
+def init_worker():
+    """Forget pooled connections inherited from the parent process"""
+    if _engine is not None:
+        _engine.dispose(close=False)
+    # Runs when the worker exits cleanly, so Postgres sees a proper disconnect
+    Finalize(None, close_worker_conn, exitpriority=10)
+
+def get_worker_cursor():
+    """Get a cursor on this process's connection, opening it on first use"""
+    if 'conn' not in _worker:
+        conn = psycopg2.connect(**DB_CONFIG)
+        conn.autocommit = False  # One transaction per file
+        # Rows are COPYed into a session-local staging table, then merged into
+        # the real table in a single INSERT ... SELECT; if the staging table
+        # can't be created, rows go straight in through a prepared INSERT
+        cursor = conn.cursor()
+        _worker['use_copy'] = create_stage(cursor)
+        if not _worker['use_copy']:
+            prepare_insert(cursor)
+        cursor.close()
+        conn.commit()
+        _worker['conn'] = conn
+    return _worker['conn'].cursor()
+
+def ingest_file(json_file):
+    """Load one JSON file in its own transaction; returns (loaded, inserted)"""
+    # Extract channel name and date from path
+    rel_path = os.path.relpath(json_file, BASE_DIR)
+    path_parts = rel_path.split(os.sep)
     
-    print(f"📂 Found {len(json_files)} JSON files")
+    if len(path_parts) >= 2:
+        date_str = path_parts[0]
+        filename = path_parts[1]
+        file_channel_name = filename.replace('.json', '')
+    else:
+        date_str = 'unknown'
+        file_channel_name = os.path.basename(json_file).replace('.json', '')
     
-    total_loaded = 0
+    print(f"   Processing: {file_channel_name} - {date_str}")
     
-    for json_file in json_files:
-        try:
-            # Extract channel name and date from path
-            rel_path = os.path.relpath(json_file, base_dir)
-            path_parts = rel_path.split(os.sep)
-            
-            if len(path_parts) >= 2:
-                date_str = path_parts[0]
-                filename = path_parts[1]
-                file_channel_name = filename.replace('.json', '')
-            else:
-                date_str = 'unknown'
-                file_channel_name = os.path.basename(json_file).replace('.json', '')
+    cursor = None
+    try:
+        # Taken before reading, so a file changed mid-load is picked up next run
+        mtime = os.path.getmtime(json_file)
+        cursor = get_worker_cursor()
+        use_copy = _worker['use_copy']
+        batch_rows = COPY_BATCH_ROWS if use_copy else INSERT_BATCH_ROWS
+        
+        rows = []
+        loaded_count = 0
+        inserted = 0
+        data = read_json_file(json_file)
+        
+        if not isinstance(data, list):
+            print(f"   Skipping: Not a list")
+            cursor.execute(LEDGER_UPSERT_SQL, (rel_path, mtime, 0))
+            _worker['conn'].commit()
+            return 0, 0
+        
+        print(f"   Found {len(data)} messages")
+        
+        # Process each message
+        for msg in data:
+            if not isinstance(msg, dict):
+                continue
             
-            print(f"   Processing: {file_channel_name} - {date_str}")
+            # Extract data with actual field names from your JSON
+            message_id = msg.get('message_id')
+            channel_name = msg.get('channel_name') or file_channel_name
+            message_date = msg.get('message_date')
+            message_text = msg.get('message_text', '')
+            views = msg.get('views', 0)
+            forwards = msg.get('forwards', 0)
+            image_path = msg.get('image_path')
+            hashtags = msg.get('hashtags', [])
             
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # The scraper's media, content-analysis (message_length, has_links,
+            # ...) and other list fields are only kept inside raw_json
             
-            if not isinstance(data, list):
-                print(f"   Skipping: Not a list")
+            # Skip if missing essential data
+            if not message_id or not message_date:
                 continue
             
-            print(f"   Found {len(data)} messages")
+            # Stage the row (image_path is stored as media_path)
+            rows.append((
+                channel_name,
+                message_id,
+                message_text,
+                message_date,
+                views,
+                forwards,
+                image_path,
+                orjson.dumps(hashtags).decode(),
+                orjson.dumps(msg).decode()
+            ))
+            if len(rows) >= batch_rows:
+                inserted += flush_rows(cursor, rows, use_copy)
             
-            # Process each message
-            loaded_count = 0
-            for msg in data:
-                if not isinstance(msg, dict):
-                    continue
-                
-                # Extract data with actual field names from your JSON
-                message_id = msg.get('message_id')
-                channel_name = msg.get('channel_name') or file_channel_name
-                message_date = msg.get('message_date')
-                message_text = msg.get('message_text', '')
-                views = msg.get('views', 0)
-                forwards = msg.get('forwards', 0)
-                
-                # Media fields
-                has_media = msg.get('has_media', False)
-                image_path = msg.get('image_path')
-                media_type = msg.get('media_type')
-                
-                # Content analysis fields
-                message_length = msg.get('message_length', 0)
-                has_links = msg.get('has_links', False)
-                has_hashtags = msg.get('has_hashtags', False)
-                has_mentions = msg.get('has_mentions', False)
-                
-                # Lists
-                hashtags = msg.get('hashtags', [])
-                mentions = msg.get('mentions', [])
-                urls = msg.get('urls', [])
-                reactions = msg.get('reactions', {})
-                
-                scraped_at = msg.get('scraped_at')
-                
-                # Skip if missing essential data
-                if not message_id or not message_date:
-                    continue
-                
-                # Insert into database
-                cursor.execute("""
-                    INSERT INTO raw_telegram.telegram_messages 
-                    (channel_name, message_id, message_text, message_date, 
-                     views, forwards, media_path, hashtags, raw_json)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (channel_name, message_id) DO NOTHING
-                """, [
-                    channel_name,
-                    message_id,
-                    message_text,
-                    message_date,
-                    views,
-                    forwards,
-                    image_path,  # Using image_path as media_path
-                    json.dumps(hashtags),
-                    json.dumps(msg)
-                ])
-                
-                loaded_count += 1
-            
-            total_loaded += loaded_count
-            print(f"   ✓ Loaded {loaded_count} messages")
-            
-        except Exception as e:
-            print(f"   ✗ Error loading {json_file}: {str(e)}")
+            loaded_count += 1
+        
+        inserted += flush_rows(cursor, rows, use_copy)
+        if use_copy:
+            cursor.execute(MERGE_SQL)
+            inserted = cursor.rowcount
+        # Recorded in the same transaction as the file's rows
+        cursor.execute(LEDGER_UPSERT_SQL, (rel_path, mtime, loaded_count))
+        _worker['conn'].commit()
+        print(f"   ✓ Loaded {loaded_count} messages from {file_channel_name}")
+        return loaded_count, inserted
+        
+    except Exception as e:
+        # A failing file only discards its own rows
+        if 'conn' in _worker:
+            _worker['conn'].rollback()
+        print(f"   ✗ Error loading {json_file}: {str(e)}")
+        return 0, 0
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+def load_telegram_data():
+    """Load Telegram data with correct field names"""
     
-    cursor.close()
-    conn.close()
+    print("📥 Loading Telegram data into PostgreSQL...")
+    
+    # Get all JSON files
+    json_pattern = os.path.join(BASE_DIR, '**', '*.json')
+    json_files = glob.glob(json_pattern, recursive=True)
+    
+    print(f"📂 Found {len(json_files)} JSON files")
+    
+    # Skip files whose (path, mtime) was already ingested
+    with get_engine().begin() as conn:
+        conn.execute(text(LEDGER_DDL))
+        ledger = dict(conn.execute(text("SELECT path, mtime FROM raw_telegram.ingest_ledger")).all())
+    json_files = [
+        json_file for json_file in json_files
+        if ledger.get(os.path.relpath(json_file, BASE_DIR)) != os.path.getmtime(json_file)
+    ]
+    print(f"   {len(json_files)} new or changed since the last load")
+    
+    total_loaded = 0
+    inserted = 0
+    
+    # Parsing is CPU-bound, so files are spread over worker processes
+    if json_files:
+        with Pool(processes=min(LOAD_WORKERS, len(json_files)), initializer=init_worker) as pool:
+            for loaded_count, file_inserted in pool.imap_unordered(
+                ingest_file, json_files, chunksize=LOAD_CHUNKSIZE
+            ):
+                total_loaded += loaded_count
+                inserted += file_inserted
+            # Let workers exit normally (and close their connections) instead
+            # of being terminated when the with-block ends
+            pool.close()
+            pool.join()
     
     print(f"\n✅ Loading complete!")
     print(f"   Total messages loaded: {total_loaded}")
+    print(f"   New messages inserted: {inserted}")
     
     # Verify the data was loaded
     verify_data()
 
+def get_engine():
+    """Get the pooled SQLAlchemy engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DB_URL, pool_size=2, pool_pre_ping=True)
+    return _engine
+
 def verify_data():
     """Verify data was loaded correctly"""
     print("\n🔍 Verifying data...")
     
-    conn = psycopg2.connect(
-        host="localhost",
-        port=5432,
-        database="medical_warehouse",
-        user="admin",
-        password="admin123"
-    )
-    cursor = conn.cursor()
+    engine = get_engine()
     
-    # Count total messages
-    cursor.execute("SELECT COUNT(*) FROM raw_telegram.telegram_messages")
-    total = cursor.fetchone()[0]
+    # Count by channel; the total is their sum
+    by_channel = pd.read_sql("""
+        SELECT channel_name, COUNT(*) as message_count 
+        FROM raw_telegram.telegram_messages 
+        GROUP BY channel_name 
+        ORDER BY message_count DESC
+    """, engine)
+    total = int(by_channel['message_count'].sum())
     print(f"   Total messages in database: {total}")
     
     if total > 0:
-        # Count by channel
-        cursor.execute("""
-            SELECT channel_name, COUNT(*) as message_count 
-            FROM raw_telegram.telegram_messages 
-            GROUP BY channel_name 
-            ORDER BY message_count DESC
-        """)
-        
         print("\n   Messages by channel:")
-        for row in cursor.fetchall():
-            print(f"     {row[0]}: {row[1]} messages")
+        print(indent(by_channel.to_string(index=False), '     '))
         
         # Show data types
-        cursor.execute("""
+        schema = pd.read_sql("""
             SELECT column_name, data_type 
             FROM information_schema.columns 
             WHERE table_schema = 'raw_telegram' 
             AND table_name = 'telegram_messages'
             ORDER BY ordinal_position
-        """)
+        """, engine)
         
         print("\n   Table schema:")
-        for row in cursor.fetchall():
-            print(f"     {row[0]}: {row[1]}")
+        print(indent(schema.to_string(index=False), '     '))
         
         # Show sample data
-        cursor.execute("""
+        sample = pd.read_sql("""
             SELECT channel_name, message_id, 
                    LEFT(message_text, 50) as preview, 
                    message_date,
@@ -183,16 +372,12 @@ def verify_data():
             FROM raw_telegram.telegram_messages 
             ORDER BY message_date DESC 
             LIMIT 5
-        """)
+        """, engine)
         
         print("\n   Sample messages (most recent):")
-        for row in cursor.fetchall():
-            print(f"     [{row[0]}] ID:{row[1]} - '{row[2]}...' - {row[3]} (👁️{row[4]} 🔄{row[5]})")
+        print(indent(sample.to_string(index=False), '     '))
     else:
         print("\n   No messages found in database")
-    
-    cursor.close()
-    conn.close()
 
 if __name__ == "__main__":
     load_telegram_data()
\ No newline at end of file
@@ -5,18 +5,25 @@ Utility functions for the pipeline.
 
 import os
 import sys
+import copy
 import json
 import yaml
 import logging
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
+from functools import lru_cache
 import hashlib
+import mmap
 import subprocess
+import time
 import psutil
 import docker
 from sqlalchemy import create_engine, text
 
+# libyaml's C loader when PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def setup_logging(log_level: str = "INFO") -> logging.Logger:
     """Setup logging configuration."""
@@ -73,8 +80,15 @@ def load_config(config_path: str = "config.yaml") -> Dict[str, Any]:
         
         return default_config
     
-    with open(config_file, 'r') as f:
-        return yaml.safe_load(f)
+    # Parsed once per file version; callers get their own copy to mutate
+    return copy.deepcopy(_parse_config(str(config_file), config_file.stat().st_mtime_ns))
+
+
+@lru_cache(maxsize=8)
+def _parse_config(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse a YAML config file (cached per path and modification time)."""
+    with open(config_path, 'r') as f:
+        return yaml.load(f, Loader=YAML_LOADER)
 
 
 def get_database_connection(config: Dict[str, Any]) -> Any:
@@ -87,13 +101,20 @@ def get_database_connection(config: Dict[str, Any]) -> Any:
     return create_engine(connection_string)
 
 
+def calculate_checksum(file_path: str, algorithm: str = "sha256") -> str:
+    """Calculate the hex digest of a file (SHA-256 by default)."""
+    digest = hashlib.new(algorithm)
+    with open(file_path, "rb") as f:
+        # Hash the whole memory-mapped file in one update (mmap rejects empty files)
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                digest.update(mm)
+    return digest.hexdigest()
+
+
 def calculate_md5(file_path: str) -> str:
     """Calculate MD5 hash of a file."""
-    hash_md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+    return calculate_checksum(file_path, "md5")
 
 
 def check_disk_space(path: str = ".", threshold_gb: float = 5.0) -> bool:
@@ -132,23 +153,30 @@ def run_command(cmd: List[str], timeout: int = 300) -> Dict[str, Any]:
         return {"success": False, "error": str(e)}
 
 
+# Parallel pg_dump worker processes (each holds one database connection)
+BACKUP_JOBS = min(8, os.cpu_count() or 1)
+
+
 def backup_database(config: Dict[str, Any], backup_dir: str = "backups") -> str:
     """Create database backup."""
     backup_path = Path(backup_dir)
     backup_path.mkdir(exist_ok=True)
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = backup_path / f"backup_{timestamp}.sql"
+    backup_file = backup_path / f"backup_{timestamp}"
     
     db_config = config["database"]
     
-    # Use pg_dump for backup
+    # Use pg_dump for backup; the directory format dumps (and compresses)
+    # tables in parallel jobs and is restored with pg_restore -j
     cmd = [
         "pg_dump",
         "-h", db_config["host"],
         "-p", str(db_config["port"]),
         "-U", db_config["user"],
         "-d", db_config["name"],
+        "-F", "directory",
+        "-j", str(BACKUP_JOBS),
         "-f", str(backup_file)
     ]
     
@@ -164,16 +192,29 @@ def backup_database(config: Dict[str, Any], backup_dir: str = "backups") -> str:
         raise Exception(f"Backup failed: {result.stderr}")
 
 
+# System metrics are re-sampled at most this often (seconds)
+METRICS_TTL = 5.0
+_metrics_cache: Dict[str, Any] = {"expires": float("-inf"), "metrics": None}
+
+# Prime psutil's CPU counters so cpu_percent(interval=None) never has to sleep
+psutil.cpu_percent(interval=None)
+
+
 def monitor_system_metrics() -> Dict[str, Any]:
-    """Collect system metrics."""
-    return {
-        "timestamp": datetime.now().isoformat(),
-        "cpu_percent": psutil.cpu_percent(interval=1),
-        "memory_percent": psutil.virtual_memory().percent,
-        "disk_usage": psutil.disk_usage(".").percent,
-        "network_io": psutil.net_io_counters()._asdict(),
-        "running_processes": len(psutil.pids())
-    }
+    """Collect system metrics (cached for METRICS_TTL seconds)."""
+    now = time.monotonic()
+    if now >= _metrics_cache["expires"]:
+        _metrics_cache["metrics"] = {
+            "timestamp": datetime.now().isoformat(),
+            # CPU usage since the previous sample, without blocking
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": psutil.virtual_memory().percent,
+            "disk_usage": psutil.disk_usage(".").percent,
+            "network_io": psutil.net_io_counters()._asdict(),
+            "running_processes": len(psutil.pids())
+        }
+        _metrics_cache["expires"] = now + METRICS_TTL
+    return copy.deepcopy(_metrics_cache["metrics"])
 
 
 def check_docker_service() -> bool:
@@ -224,28 +265,60 @@ def send_alert(message: str, alert_type: str = "error") -> None:
         f.write(f"{datetime.now().isoformat()} - {alert_type.upper()}: {message}\n")
 
 
+# Walk and unlink relative to open directory descriptors (unlinkat) where supported
+USE_DIR_FD = os.unlink in os.supports_dir_fd and os.scandir in os.supports_fd
+
+
+def _walk_files(
+    path: str, dir_fd: Optional[int] = None, name: Optional[str] = None
+) -> Iterator[Tuple[Optional[int], str, os.DirEntry]]:
+    """
+    Yield (dir_fd, parent, entry) for the files under a directory tree.
+    
+    With USE_DIR_FD each directory is opened once (by `name` relative to
+    `dir_fd` below the top) and its entries are relative to that descriptor;
+    otherwise dir_fd is None and entry.path is a full path. Symlinked
+    directories are not descended into, and directories that can't be
+    read (or vanish mid-walk) are skipped with a warning alert.
+    """
+    fd = None
+    try:
+        if USE_DIR_FD:
+            flags = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+            fd = os.open(path if dir_fd is None else name, flags, dir_fd=dir_fd)
+        with os.scandir(path if fd is None else fd) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _walk_files(os.path.join(path, entry.name), fd, entry.name)
+                elif entry.is_file():
+                    yield fd, path, entry
+    except OSError as e:
+        send_alert(f"Skipping unreadable directory {path}: {str(e)}", "warning")
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+
 def cleanup_old_files(directory: str, days_old: int = 30) -> int:
     """Clean up files older than specified days."""
-    cleanup_dir = Path(directory)
-    cutoff_date = datetime.now() - timedelta(days=days_old)
+    cutoff = (datetime.now() - timedelta(days=days_old)).timestamp()
     deleted_count = 0
     
-    if not cleanup_dir.exists():
+    if not os.path.isdir(directory):
         return 0
     
-    for file_path in cleanup_dir.rglob("*"):
-        if file_path.is_file():
-            file_mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
-            if file_mtime < cutoff_date:
-                try:
-                    file_path.unlink()
-                    deleted_count += 1
-                except Exception as e:
-                    send_alert(f"Failed to delete {file_path}: {str(e)}", "warning")
+    # DirEntry type checks come from readdir, leaving one stat per file, and
+    # unlinkat() on the open directory skips re-resolving the full path
+    for dir_fd, parent, entry in _walk_files(directory):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path, dir_fd=dir_fd)
+                deleted_count += 1
+        except Exception as e:
+            send_alert(f"Failed to delete {os.path.join(parent, entry.name)}: {str(e)}", "warning")
     
     return deleted_count
 
-
 if __name__ == "__main__":
     # Test utilities
     logger = setup_logging()
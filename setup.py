@@ -14,5 +14,6 @@ setup(
         "pytest==8.0.0",
         "pytest-asyncio==0.23.2",
         "httpx==0.27.0",
+        "orjson>=3.9.10",
     ],
 )
@@ -2,19 +2,39 @@
 Configuration management for the pipeline.
 """
 
+import copy
+import functools
 import os
 import sys
-from pathlib import Path
+from pathlib import Path, PurePath
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 import yaml
 import json
+import orjson
 from dotenv import load_dotenv
 
+try:
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+
 # Load environment variables
 load_dotenv()
 
+# Directories already created by this process
+_DIRS_CREATED: set = set()
+
+
+def _ensure_dir(path: Path) -> None:
+    """Create a directory (and parents) once per process."""
+    # Keyed on the absolute path so a chdir does not skip a new location
+    key = path.absolute()
+    if key not in _DIRS_CREATED:
+        path.mkdir(parents=True, exist_ok=True)
+        _DIRS_CREATED.add(key)
+
 
 class Environment(Enum):
     """Environment types."""
@@ -89,7 +109,7 @@ class YOLOConfig:
         "text"
     ])
     
-    @property
+    @functools.cached_property
     def model_weights(self) -> str:
         """Get model weights path."""
         if Path(self.model_path).exists():
@@ -139,11 +159,14 @@ class PipelineConfig:
     temp_dir: Path = Path("temp")
     
     def __post_init__(self):
-        """Create directories after initialization."""
-        self.data_dir.mkdir(parents=True, exist_ok=True)
-        self.reports_dir.mkdir(parents=True, exist_ok=True)
-        self.backups_dir.mkdir(parents=True, exist_ok=True)
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        """Coerce plain YAML values and create directories after initialization."""
+        self.environment = Environment(self.environment)
+        self.data_dir = Path(self.data_dir)
+        self.reports_dir = Path(self.reports_dir)
+        self.backups_dir = Path(self.backups_dir)
+        self.temp_dir = Path(self.temp_dir)
+        for dir_path in (self.data_dir, self.reports_dir, self.backups_dir, self.temp_dir):
+            _ensure_dir(dir_path)
 
 
 @dataclass
@@ -172,6 +195,24 @@ class SecurityConfig:
     ssl_key_path: Optional[str] = None
 
 
+class _ConfigDumper(_Dumper):
+    """Safe YAML dumper that writes enums and paths as plain strings."""
+
+
+_ConfigDumper.add_multi_representer(Enum, lambda dumper, value: dumper.represent_str(value.value))
+_ConfigDumper.add_multi_representer(PurePath, lambda dumper, value: dumper.represent_str(str(value)))
+
+
+@functools.lru_cache(maxsize=4)
+def _load_config_file(path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse a config file; cached per (path, mtime) so unchanged files parse once."""
+    if path.endswith(".json"):
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read()) or {}
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=_Loader) or {}
+
+
 @dataclass
 class Config:
     """Main configuration class."""
@@ -191,7 +232,7 @@ class Config:
     
     @classmethod
     def from_yaml(cls, config_path: str = "config.yaml") -> "Config":
-        """Load configuration from YAML file."""
+        """Load configuration from a YAML (or ``.json``) file."""
         config_file = Path(config_path)
         
         if not config_file.exists():
@@ -200,8 +241,10 @@ class Config:
             default_config.save_yaml(config_path)
             return default_config
         
-        with open(config_file, 'r') as f:
-            yaml_data = yaml.safe_load(f)
+        # Copy so callers never mutate the cached parse
+        yaml_data = copy.deepcopy(
+            _load_config_file(str(config_file), config_file.stat().st_mtime_ns)
+        )
         
         # Convert to Config object
         return cls(
@@ -234,7 +277,10 @@ class Config:
         }
         
         with open(config_file, 'w') as f:
-            yaml.dump(config_dict, f, default_flow_style=False, indent=2)
+            yaml.dump(
+                config_dict, f, Dumper=_ConfigDumper,
+                default_flow_style=False, indent=2, sort_keys=False,
+            )
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert configuration to dictionary."""
@@ -270,7 +316,7 @@ class Config:
             self.pipeline.backups_dir,
         ]:
             try:
-                dir_path.mkdir(parents=True, exist_ok=True)
+                _ensure_dir(dir_path)
             except Exception as e:
                 errors.append(f"Cannot create directory {dir_path}: {str(e)}")
         
@@ -309,45 +355,49 @@ def reload_config(config_path: str = "config.yaml") -> Config:
 
 def print_config_summary() -> None:
     """Print configuration summary."""
-    print("=" * 60)
-    print("Medical Telegram Warehouse Configuration")
-    print("=" * 60)
-    
     cfg = get_config()
     
-    print(f"\n📊 Environment: {cfg.pipeline.environment.value}")
-    print(f"🔧 Debug Mode: {cfg.debug}")
-    print(f"🧪 Testing Mode: {cfg.testing}")
+    # Collected and written at once instead of one locked, flushed print per line
+    lines = []
+    lines.append("=" * 60)
+    lines.append("Medical Telegram Warehouse Configuration")
+    lines.append("=" * 60)
+    
+    lines.append(f"\n📊 Environment: {cfg.pipeline.environment.value}")
+    lines.append(f"🔧 Debug Mode: {cfg.debug}")
+    lines.append(f"🧪 Testing Mode: {cfg.testing}")
+    
+    lines.append(f"\n📁 Directories:")
+    lines.append(f"   Data: {cfg.pipeline.data_dir}")
+    lines.append(f"   Reports: {cfg.pipeline.reports_dir}")
+    lines.append(f"   Backups: {cfg.pipeline.backups_dir}")
     
-    print(f"\n📁 Directories:")
-    print(f"   Data: {cfg.pipeline.data_dir}")
-    print(f"   Reports: {cfg.pipeline.reports_dir}")
-    print(f"   Backups: {cfg.pipeline.backups_dir}")
+    lines.append(f"\n🗄️  Database:")
+    lines.append(f"   Host: {cfg.database.host}:{cfg.database.port}")
+    lines.append(f"   Name: {cfg.database.name}")
+    lines.append(f"   User: {cfg.database.user}")
     
-    print(f"\n🗄️  Database:")
-    print(f"   Host: {cfg.database.host}:{cfg.database.port}")
-    print(f"   Name: {cfg.database.name}")
-    print(f"   User: {cfg.database.user}")
+    lines.append(f"\n📱 Telegram:")
+    lines.append(f"   API ID: {'*' * len(cfg.telegram.api_id) if cfg.telegram.api_id else 'Not set'}")
+    lines.append(f"   Channels: {', '.join(cfg.telegram.channels)}")
     
-    print(f"\n📱 Telegram:")
-    print(f"   API ID: {'*' * len(cfg.telegram.api_id) if cfg.telegram.api_id else 'Not set'}")
-    print(f"   Channels: {', '.join(cfg.telegram.channels)}")
+    lines.append(f"\n🔍 YOLO Detection:")
+    lines.append(f"   Model: {cfg.yolo.model_path}")
+    lines.append(f"   Confidence: {cfg.yolo.confidence_threshold}")
+    lines.append(f"   Classes: {', '.join(cfg.yolo.classes)}")
     
-    print(f"\n🔍 YOLO Detection:")
-    print(f"   Model: {cfg.yolo.model_path}")
-    print(f"   Confidence: {cfg.yolo.confidence_threshold}")
-    print(f"   Classes: {', '.join(cfg.yolo.classes)}")
+    lines.append(f"\n🌐 API:")
+    lines.append(f"   Host: {cfg.api.host}:{cfg.api.port}")
+    lines.append(f"   Docs: {cfg.api.docs_url}")
     
-    print(f"\n🌐 API:")
-    print(f"   Host: {cfg.api.host}:{cfg.api.port}")
-    print(f"   Docs: {cfg.api.docs_url}")
+    lines.append(f"\n⚡ Pipeline:")
+    lines.append(f"   Max Retries: {cfg.pipeline.max_retries}")
+    lines.append(f"   Timeout: {cfg.pipeline.timeout}s")
+    lines.append(f"   Log Level: {cfg.pipeline.log_level}")
     
-    print(f"\n⚡ Pipeline:")
-    print(f"   Max Retries: {cfg.pipeline.max_retries}")
-    print(f"   Timeout: {cfg.pipeline.timeout}s")
-    print(f"   Log Level: {cfg.pipeline.log_level}")
+    lines.append("\n" + "=" * 60)
     
-    print("\n" + "=" * 60)
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":
@@ -4,16 +4,26 @@ Logging configuration for the pipeline.
 
 import logging
 import sys
+from collections import Counter
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import json
 from datetime import datetime
+import numpy as np
 from loguru import logger
 
 
+# Attributes every LogRecord carries; anything else came from ``extra=``
+_STDLIB_RECORD_KEYS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
 class InterceptHandler(logging.Handler):
     """Intercept standard logging messages toward Loguru."""
     
+    # Caller depth per call site: the logging frames between a given call
+    # and emit() never change, so the stack is walked once per site
+    _depth_cache: Dict[Tuple[str, int], int] = {}
+    
     def emit(self, record):
         # Get corresponding Loguru level if it exists
         try:
@@ -22,12 +32,20 @@ class InterceptHandler(logging.Handler):
             level = record.levelno
         
         # Find caller from where originated the logged message
-        frame, depth = logging.currentframe(), 2
-        while frame.f_code.co_filename == logging.__file__:
-            frame = frame.f_back
-            depth += 1
+        site = (record.pathname, record.lineno)
+        depth = self._depth_cache.get(site)
+        if depth is None:
+            frame, depth = sys._getframe(), 0
+            while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+                frame = frame.f_back
+                depth += 1
+            self._depth_cache[site] = depth
         
-        logger.opt(depth=depth, exception=record.exc_info).log(
+        # Carry stdlib ``extra=`` fields over as Loguru extras
+        extra_keys = record.__dict__.keys() - _STDLIB_RECORD_KEYS
+        target = logger.bind(**{key: record.__dict__[key] for key in extra_keys}) if extra_keys else logger
+        
+        target.opt(depth=depth, exception=record.exc_info).log(
             level, record.getMessage()
         )
 
@@ -49,6 +67,7 @@ def setup_logger(
         log_file: Path to log file (if None, logs only to console)
         rotation: Log rotation size or time
         retention: Log retention period
+        enqueue: Write all sinks (console, log file, error log) from a background thread
     
     Returns:
         Configured logger instance
@@ -84,6 +103,7 @@ def setup_logger(
         colorize=True,
         backtrace=True,
         diagnose=True,
+        enqueue=enqueue,  # Console writes also drain on the background thread
     )
     
     # Add file handler if specified
@@ -116,10 +136,14 @@ def setup_logger(
         compression="zip",
         backtrace=True,
         diagnose=True,
+        enqueue=enqueue,  # Keep error-path disk writes off the caller thread
     )
     
-    # Intercept standard logging
-    logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
+    # Intercept standard logging; records below the sinks' level are dropped
+    # by logging's isEnabledFor() before a LogRecord is even created
+    logging.basicConfig(
+        handlers=[InterceptHandler()], level=logger.level(log_level).no, force=True
+    )
     
     return logger.bind(pipeline="medical_telegram")
 
@@ -129,7 +153,10 @@ def log_pipeline_start(pipeline_name: str, run_id: str, config: dict) -> None:
     
     logger.info(f"🚀 Starting pipeline: {pipeline_name}")
     logger.info(f"📝 Run ID: {run_id}")
-    logger.info(f"⚙️  Configuration: {json.dumps(config, indent=2, default=str)}")
+    # Only serialized if a sink actually accepts INFO records
+    logger.opt(lazy=True).info(
+        "⚙️  Configuration: {}", lambda: json.dumps(config, indent=2, default=str)
+    )
     logger.info(f"📁 Working directory: {Path.cwd()}")
 
 
@@ -163,6 +190,27 @@ def log_task_end(task_name: str, task_id: str, duration: float, success: bool) -
     logger.info(f"   Duration: {duration:.2f} seconds")
 
 
+class TaskLoggerAdapter(logging.LoggerAdapter):
+    """Tag records with the task name, merged with any per-call ``extra``."""
+    
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**self.extra, **(kwargs.get("extra") or {})}
+        return msg, kwargs
+
+
+def get_task_logger(task_name: str) -> TaskLoggerAdapter:
+    """
+    Get a logger for one pipeline task.
+    
+    The underlying stdlib logger has no handlers of its own: records
+    propagate to the InterceptHandler installed by setup_logger, so asking
+    for a task logger never opens files or reconfigures logging.
+    """
+    return TaskLoggerAdapter(
+        logging.getLogger(f"medical_telegram.{task_name}"), {"task": task_name}
+    )
+
+
 def log_detection_results(detections: list, model: str, confidence_threshold: float) -> None:
     """Log YOLO detection results."""
     
@@ -171,10 +219,7 @@ def log_detection_results(detections: list, model: str, confidence_threshold: fl
         return
     
     # Count by class
-    class_counts = {}
-    for detection in detections:
-        class_name = detection.get("class", "unknown")
-        class_counts[class_name] = class_counts.get(class_name, 0) + 1
+    class_counts = Counter(detection.get("class", "unknown") for detection in detections)
     
     logger.info(f"🔍 Detection Results:")
     logger.info(f"   Model: {model}")
@@ -185,25 +230,47 @@ def log_detection_results(detections: list, model: str, confidence_threshold: fl
         logger.info(f"   - {class_name}: {count}")
     
     # Log high confidence detections
-    high_conf = [d for d in detections if d.get("confidence", 0) > 0.8]
-    if high_conf:
-        logger.info(f"   High confidence (>0.8): {len(high_conf)}")
+    confidences = np.fromiter(
+        (d.get("confidence", 0.0) for d in detections), dtype=np.float64, count=len(detections)
+    )
+    high_conf_count = np.count_nonzero(confidences > 0.8)
+    if high_conf_count:
+        logger.info(f"   High confidence (>0.8): {high_conf_count}")
+
+
+# Tables estimated above this many rows report pg_class.reltuples
+# instead of an exact COUNT(*)
+EXACT_COUNT_MAX_ROWS = 1_000_000
 
 
 def log_database_stats(engine, table_name: str) -> None:
     """Log database table statistics."""
+    from sqlalchemy import text
+    
+    # Quote each part of a (possibly schema-qualified) name
+    quote = engine.dialect.identifier_preparer.quote
+    table = ".".join(quote(part) for part in table_name.split("."))
+    
+    # One round-trip; the exact count subquery only runs for small tables
+    # (never-analyzed tables report reltuples = -1 and are counted exactly)
+    stats_sql = text(f"""
+        SELECT
+            CASE WHEN est.n < :exact_max THEN (SELECT COUNT(*) FROM {table})
+                 ELSE est.n END AS row_count,
+            (SELECT MAX(created_at) FROM {table}) AS latest_time
+        FROM (
+            SELECT COALESCE(
+                (SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)), -1
+            ) AS n
+        ) AS est
+    """)
     
     try:
+        # Checks a connection out of the engine's pool rather than opening one
         with engine.connect() as conn:
-            # Get row count
-            count_result = conn.execute(f"SELECT COUNT(*) FROM {table_name}")
-            row_count = count_result.scalar()
-            
-            # Get latest timestamp
-            time_result = conn.execute(
-                f"SELECT MAX(created_at) FROM {table_name}"
-            )
-            latest_time = time_result.scalar()
+            row_count, latest_time = conn.execute(
+                stats_sql, {"exact_max": EXACT_COUNT_MAX_ROWS, "table": table}
+            ).one()
             
             logger.info(f"📊 Database Stats for {table_name}:")
             logger.info(f"   Total rows: {row_count:,}")
@@ -39,3 +39,6 @@ SCRAPE_DELAY_SECONDS = 1
 # KPI Thresholds
 ANOMALY_CONFIDENCE_THRESHOLD = 0.5
 RISK_SCORE_THRESHOLD = 0.7
+
+# calculate_kpis reuses results for identical data for this long (seconds)
+KPI_CACHE_TTL = 300
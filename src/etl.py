@@ -59,8 +59,10 @@ def clean_data(raw_data: List[Dict[str, Any]]) -> pd.DataFrame:
     
     # 2. Handle missing values
     df['message_text'] = df['message_text'].fillna('')
-    df['views'] = df['views'].fillna(0).astype(int)
-    df['forwards'] = df['forwards'].fillna(0).astype(int)
+    # Engagement counters are stored in the smallest integer type that fits
+    df['views'] = pd.to_numeric(df['views'].fillna(0).astype(int), downcast='integer')
+    df['forwards'] = pd.to_numeric(df['forwards'].fillna(0).astype(int), downcast='integer')
+    df['has_media'] = df['has_media'].fillna(False).astype(bool)
     
     # 3. Filter out messages without text AND media (likely service messages)
     df = df[df['message_text'].str.strip().ne('') | df['has_media'] == True]
@@ -69,6 +71,9 @@ def clean_data(raw_data: List[Dict[str, Any]]) -> pd.DataFrame:
     df['message_date'] = pd.to_datetime(df['message_date'], errors='coerce')
     df = df.dropna(subset=['message_date'])
     
+    # 5. Store channel names as a Categorical (small integer codes)
+    df['channel_name'] = df['channel_name'].astype('category')
+    
     logger.info(f"Cleaned data: {len(df)} records remaining.")
     return df
 
@@ -1,5 +1,6 @@
 import asyncio
 import json
+import logging
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -11,6 +12,8 @@ from telethon.tl.types import (
     Message, 
     MessageMediaPhoto, 
     MessageMediaDocument,
+    MessageEntityHashtag,
+    MessageEntityMention,
     Channel,
     User
 )
@@ -389,14 +392,16 @@ class TelegramScraper:
             
             await message.download_media(file=str(filepath))
             
-            self.scraper_logger.debug(
-                f"Downloaded media: {filename}",
-                extra={
-                    "message_id": message.id,
-                    "channel": channel_name,
-                    "file_size": filepath.stat().st_size if filepath.exists() else 0
-                }
-            )
+            # The stat() calls are only worth making if DEBUG is enabled
+            if self.scraper_logger.isEnabledFor(logging.DEBUG):
+                self.scraper_logger.debug(
+                    f"Downloaded media: {filename}",
+                    extra={
+                        "message_id": message.id,
+                        "channel": channel_name,
+                        "file_size": filepath.stat().st_size if filepath.exists() else 0
+                    }
+                )
             
             return str(filepath.relative_to(self.raw_data_path))
             
@@ -432,15 +437,15 @@ class TelegramScraper:
         }
         
         if message.entities:
+            text = message.message
             for entity in message.entities:
-                text = message.message[entity.offset:entity.offset + entity.length]
-                
+                # Only hashtags and mentions need their text sliced out
                 if hasattr(entity, 'url'):
                     entities["urls"].append(entity.url)
-                elif entity.__class__.__name__ == 'MessageEntityHashtag':
-                    entities["hashtags"].append(text)
-                elif entity.__class__.__name__ == 'MessageEntityMention':
-                    entities["mentions"].append(text)
+                elif isinstance(entity, MessageEntityHashtag):
+                    entities["hashtags"].append(text[entity.offset:entity.offset + entity.length])
+                elif isinstance(entity, MessageEntityMention):
+                    entities["mentions"].append(text[entity.offset:entity.offset + entity.length])
         
         return entities
     
@@ -38,6 +38,15 @@ def test_get_detections():
     assert data["limit"] == 5
     assert data["min_confidence"] == 0.7
 
+def test_get_detections_filters():
+    """Test detections endpoint confidence and channel filters"""
+    response = client.get("/api/v1/detections?min_confidence=0.8&channel=chemed123")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == len(data["detections"]) > 0
+    assert all(d["confidence"] >= 0.8 for d in data["detections"])
+    assert all(d["channel_name"] == "chemed123" for d in data["detections"])
+
 def test_get_detection_stats():
     """Test detection statistics endpoint"""
     response = client.get("/api/v1/detections/stats")
@@ -63,6 +72,68 @@ def test_search():
     assert data["success"] == True
     assert data["query"] == "medicine"
 
+def test_response_cache():
+    """Test identical requests share a cached response within the TTL"""
+    first = client.get("/health").json()
+    second = client.get("/health").json()
+    assert first["timestamp"] == second["timestamp"]
+    
+    filtered = client.get("/api/v1/detections?limit=2").json()
+    assert filtered["limit"] == 2
+    assert client.get("/api/v1/detections?limit=3").json()["limit"] == 3
+
+def test_etag_not_modified():
+    """Test constant endpoints answer If-None-Match with 304"""
+    response = client.get("/api/v1/detections/stats")
+    etag = response.headers["etag"]
+    
+    response = client.get("/api/v1/detections/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    
+    response = client.get("/api/v1/channels", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+def test_gzip_compression():
+    """Test larger responses are gzip-compressed"""
+    response = client.get("/api/v1/detections?limit=20", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["count"] == 20
+    
+    # Constant bodies served below the router are compressed per request
+    compressed = client.get("/api/v1/channels", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/api/v1/channels", headers={"Accept-Encoding": "identity"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in plain.headers
+    assert compressed.json() == plain.json()
+
+def test_cors_headers():
+    """Test CORS headers on simple and preflight requests"""
+    origin = "http://localhost:3000"
+    response = client.get("/health", headers={"Origin": origin})
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == origin
+    assert response.headers["access-control-allow-credentials"] == "true"
+    
+    response = client.options(
+        "/api/v1/channels",
+        headers={
+            "Origin": origin,
+            "Access-Control-Request-Method": "GET",
+            "Access-Control-Request-Headers": "x-api-key",
+        },
+    )
+    assert response.status_code == 204
+    assert response.headers["access-control-allow-origin"] == origin
+    assert response.headers["access-control-allow-headers"] == "x-api-key"
+    
+    response = client.get("/api/v1/detections/stats", headers={"Origin": origin})
+    assert response.headers["access-control-allow-origin"] == origin
+    
+    response = client.get("/health")
+    assert "access-control-allow-origin" not in response.headers
+
 def test_invalid_parameters():
     """Test error handling for invalid parameters"""
     response = client.get("/api/v1/detections?min_confidence=invalid")
@@ -6,7 +6,8 @@ import os
 import json
 
 from src.etl import ingest_data, clean_data, load_to_db
-from src.analytics import calculate_kpis, get_risk_scores, detect_anomalies
+from src.analytics import calculate_kpis, calculate_per_channel_kpis, calibrate_risk, get_risk_scores, detect_anomalies
+import src.analytics as analytics
 
 # Test Data
 MOCK_RAW_DATA = [
@@ -116,3 +117,45 @@ def test_load_to_db_success(mock_connect):
     
     assert success is True
     assert mock_conn.cursor.called
+
+def test_per_channel_kpis_aggregate_in_one_pass():
+    """Test 9: Per-channel KPIs sum engagement and media for each channel"""
+    df = clean_data(MOCK_RAW_DATA)
+    stats = calculate_per_channel_kpis(df)
+    assert set(stats.index) == {"@CheMed123", "@lobelia4cosmetics"}
+    assert stats.loc["@CheMed123", "msg_count"] == 1
+    assert stats.loc["@lobelia4cosmetics", "views_total"] == 500
+    assert stats["media_total"].sum() == 1
+
+def test_calibrated_risk_flags_outlier_only():
+    """Test 10: A calibrated median/MAD baseline flags only the outlying message"""
+    baseline = pd.DataFrame({"views": [100, 120, 90, 110, 105], "forwards": [5, 6, 4, 5, 5]})
+    batch = pd.DataFrame({"views": [100, 50000], "forwards": [5, 900], "has_media": [False, True]})
+    try:
+        calibrate_risk(baseline)
+        analyzed_df = detect_anomalies(batch)
+    finally:
+        analytics._CALIB.update(mu=None, scale=None)
+    assert analyzed_df["is_anomaly"].tolist() == [False, True]
+    assert analyzed_df["risk_score"].between(0, 1).all()
+
+def test_calculate_kpis_skips_missing_view_counts():
+    """Test 11: KPI totals and averages skip missing view counts"""
+    df = pd.DataFrame({
+        "channel_name": ["a", "b"],
+        "views": [1.0, np.nan],
+        "forwards": [1, 2],
+        "has_media": [True, False]
+    })
+    kpis = calculate_kpis(df)
+    assert kpis["total_views"] == 1
+    assert kpis["avg_views_per_message"] == 1.0
+    assert kpis["total_forwards"] == 3
+
+    # Object columns holding None (not run through clean_data) behave the same
+    df["views"] = pd.Series([1, None], dtype=object)
+    df["forwards"] = pd.Series([None, 2], dtype=object)
+    kpis = calculate_kpis(df)
+    assert kpis["total_views"] == 1
+    assert kpis["avg_views_per_message"] == 1.0
+    assert kpis["total_forwards"] == 2
@@ -12,7 +12,8 @@ from src.common.logger import (
     log_task_start, 
     log_task_end,
     log_detection_results,
-    log_error_with_context
+    log_error_with_context,
+    get_task_logger
 )
 
 @pytest.fixture
@@ -95,3 +96,19 @@ def test_log_error_with_context(temp_log_file):
         assert "step: ingestion" in content
         assert "id: msg_001" in content
         assert "Traceback" in content
+
+def test_get_task_logger_tags_records(temp_log_file):
+    """Test that task loggers reuse the setup_logger sinks and tag the task."""
+    setup_logger(log_file=temp_log_file, enqueue=False)
+    
+    task_logger = get_task_logger("scraping")
+    task_logger.info("Scraped channel", extra={"channel": "@chemed123"})
+    task_logger.warning("No extra fields", extra=None)
+    
+    assert not task_logger.logger.handlers
+    with open(temp_log_file, "r", encoding="utf-8") as f:
+        content = f.read()
+        assert "Scraped channel" in content
+        assert "'task': 'scraping'" in content
+        assert "'channel': '@chemed123'" in content
+        assert "No extra fields" in content